@@ -0,0 +1,60 @@
+import functools
+from concurrent.futures import ProcessPoolExecutor
+
+from eth_account import Account
+from eth_account.hdaccount import seed_from_mnemonic
+from eth_account.hdaccount._utils import hmac_sha512
+from eth_account.hdaccount.deterministic import Node, SoftNode, derive_child_key
+
+# the parent of `ETHEREUM_DEFAULT_PATH`, the accounts are its children
+ACCOUNTS_PATH = "m/44'/60'/0'/0"
+DERIVE_CHUNK_SIZE = 256
+
+
+@functools.lru_cache()
+def parent_key(mnemonic, path=ACCOUNTS_PATH, passphrase=""):
+    """
+    the extended private key `(key, chain code)` of the path, the key stretching
+    of the mnemonic and the hardened derivations are only done once per process.
+    """
+    node = hmac_sha512(b"Bitcoin seed", seed_from_mnemonic(mnemonic, passphrase))
+    key, chain_code = node[:32], node[32:]
+    for segment in path.split("/")[1:]:
+        key, chain_code = derive_child_key(key, chain_code, Node.decode(segment))
+    return key, chain_code
+
+
+def derive_key(mnemonic, index, path=ACCOUNTS_PATH):
+    "the private key of `{path}/{index}`"
+    key, _ = derive_child_key(*parent_key(mnemonic, path), SoftNode(index))
+    return key
+
+
+def _derive_range(mnemonic, path, start, end):
+    accounts = []
+    for i in range(start, end):
+        acct = Account.from_key(derive_key(mnemonic, i, path))
+        accounts.append((acct.address, acct.key))
+    return accounts
+
+
+def derive_accounts(n, mnemonic, start=0, path=ACCOUNTS_PATH, processes=None):
+    """
+    derive `n` accounts from `{path}/{start}`, return `[(address, private key)]`,
+    the chunks are derived in a process pool, the first account is the same as
+    `Account.from_mnemonic(mnemonic)` with the default path.
+    """
+    chunks = [
+        (begin, min(begin + DERIVE_CHUNK_SIZE, start + n))
+        for begin in range(start, start + n, DERIVE_CHUNK_SIZE)
+    ]
+    if len(chunks) <= 1:
+        return [
+            acct for chunk in chunks for acct in _derive_range(mnemonic, path, *chunk)
+        ]
+    with ProcessPoolExecutor(processes) as executor:
+        futures = [
+            executor.submit(_derive_range, mnemonic, path, begin, end)
+            for begin, end in chunks
+        ]
+        return [acct for fut in futures for acct in fut.result()]
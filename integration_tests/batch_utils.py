@@ -0,0 +1,196 @@
+import rlp
+from cprotobuf import Field, ProtoEntity
+from eth_utils import keccak, to_checksum_address
+from hexbytes import HexBytes
+
+from .protobuf.cosmos.base.v1beta1.coin_pb2 import Coin
+from .protobuf.cosmos.tx.v1beta1.tx_pb2 import AuthInfo, Fee, TxBody, TxRaw
+from .protobuf.google.protobuf.any_pb2 import Any
+from .utils import sign_transaction
+
+EVM_DENOM = "basetely"
+
+
+class AccessTuple(ProtoEntity):
+    address = Field("string", 1)
+    storage_keys = Field("string", 2, repeated=True)
+
+
+class LegacyTx(ProtoEntity):
+    nonce = Field("uint64", 1)
+    gas_price = Field("string", 2)
+    gas = Field("uint64", 3)
+    to = Field("string", 4)
+    value = Field("string", 5)
+    data = Field("bytes", 6)
+    v = Field("bytes", 7)
+    r = Field("bytes", 8)
+    s = Field("bytes", 9)
+
+
+class AccessListTx(ProtoEntity):
+    chain_id = Field("string", 1)
+    nonce = Field("uint64", 2)
+    gas_price = Field("string", 3)
+    gas = Field("uint64", 4)
+    to = Field("string", 5)
+    value = Field("string", 6)
+    data = Field("bytes", 7)
+    accesses = Field(AccessTuple, 8, repeated=True)
+    v = Field("bytes", 9)
+    r = Field("bytes", 10)
+    s = Field("bytes", 11)
+
+
+class DynamicFeeTx(ProtoEntity):
+    chain_id = Field("string", 1)
+    nonce = Field("uint64", 2)
+    gas_tip_cap = Field("string", 3)
+    gas_fee_cap = Field("string", 4)
+    gas = Field("uint64", 5)
+    to = Field("string", 6)
+    value = Field("string", 7)
+    data = Field("bytes", 8)
+    accesses = Field(AccessTuple, 9, repeated=True)
+    v = Field("bytes", 10)
+    r = Field("bytes", 11)
+    s = Field("bytes", 12)
+
+
+class MsgEthereumTx(ProtoEntity):
+    data = Field("bytes", 1)  # google.protobuf.Any
+    size = Field("double", 2)
+    hash = Field("string", 3)
+    # a valid msg should have empty `from`
+    from_ = Field("string", 4)
+
+
+def pack_any(type_url, value):
+    return Any(type_url=type_url, value=bytes(value))
+
+
+def _int(bz):
+    return int.from_bytes(bz, "big")
+
+
+def _to(bz):
+    return to_checksum_address(bz) if bz else ""
+
+
+def _accesses(access_list):
+    return [
+        AccessTuple(
+            address=to_checksum_address(address),
+            storage_keys=["0x" + key.hex() for key in keys],
+        )
+        for address, keys in access_list
+    ]
+
+
+def decode_tx_data(raw):
+    """
+    decode a signed raw eth tx into the ethermint tx data,
+    return the packed tx data, the fee it pays and the gas limit.
+    """
+    if raw[0] >= 0xC0:
+        nonce, gas_price, gas, to, value, data, v, r, s = rlp.decode(raw)
+        tx = LegacyTx(
+            nonce=_int(nonce),
+            gas_price=str(_int(gas_price)),
+            gas=_int(gas),
+            to=_to(to),
+            value=str(_int(value)),
+            data=data,
+            v=v,
+            r=r,
+            s=s,
+        )
+        type_url, fee_cap = "/ethermint.evm.v1.LegacyTx", gas_price
+    elif raw[0] == 1:
+        fields = rlp.decode(raw[1:])
+        chain_id, nonce, gas_price, gas, to, value, data, accesses, v, r, s = fields
+        tx = AccessListTx(
+            chain_id=str(_int(chain_id)),
+            nonce=_int(nonce),
+            gas_price=str(_int(gas_price)),
+            gas=_int(gas),
+            to=_to(to),
+            value=str(_int(value)),
+            data=data,
+            accesses=_accesses(accesses),
+            v=v,
+            r=r,
+            s=s,
+        )
+        type_url, fee_cap = "/ethermint.evm.v1.AccessListTx", gas_price
+    elif raw[0] == 2:
+        fields = rlp.decode(raw[1:])
+        chain_id, nonce, tip_cap, fee_cap, gas, to, value, data, accesses = fields[:9]
+        v, r, s = fields[9:]
+        tx = DynamicFeeTx(
+            chain_id=str(_int(chain_id)),
+            nonce=_int(nonce),
+            gas_tip_cap=str(_int(tip_cap)),
+            gas_fee_cap=str(_int(fee_cap)),
+            gas=_int(gas),
+            to=_to(to),
+            value=str(_int(value)),
+            data=data,
+            accesses=_accesses(accesses),
+            v=v,
+            r=r,
+            s=s,
+        )
+        type_url = "/ethermint.evm.v1.DynamicFeeTx"
+    else:
+        raise ValueError(f"unsupported tx type: {raw[0]}")
+    return (
+        pack_any(type_url, tx.SerializeToString()),
+        _int(fee_cap) * _int(gas),
+        _int(gas),
+    )
+
+
+def encode_batch_tx(raw_txs, denom=EVM_DENOM):
+    """
+    build a cosmos tx containing a `MsgEthereumTx` for each signed raw eth tx,
+    same as what `tx evm raw` does, return the `TxRaw` bytes and the eth tx hashes.
+    """
+    msgs = []
+    tx_hashes = []
+    fee = 0
+    gas_limit = 0
+    for raw in raw_txs:
+        raw = bytes(raw)
+        data, tx_fee, tx_gas = decode_tx_data(raw)
+        tx_hash = keccak(raw)
+        msg = MsgEthereumTx(data=data.SerializeToString(), hash="0x" + tx_hash.hex())
+        msgs.append(
+            pack_any("/ethermint.evm.v1.MsgEthereumTx", msg.SerializeToString())
+        )
+        tx_hashes.append(HexBytes(tx_hash))
+        fee += tx_fee
+        gas_limit += tx_gas
+    body = TxBody(
+        messages=msgs,
+        extension_options=[
+            pack_any("/ethermint.evm.v1.ExtensionOptionsEthereumTx", b"")
+        ],
+    )
+    auth_info = AuthInfo(
+        fee=Fee(
+            amount=[Coin(denom=denom, amount=str(fee))] if fee > 0 else [],
+            gas_limit=gas_limit,
+        )
+    )
+    tx = TxRaw(
+        body_bytes=body.SerializeToString(),
+        auth_info_bytes=auth_info.SerializeToString(),
+    )
+    return tx.SerializeToString(), tx_hashes
+
+
+def build_batch_tx_raw(w3, txs, key=None, manager=None):
+    "sign the txs and return the cosmos batch tx bytes and eth tx hashes"
+    signed_txs = [sign_transaction(w3, tx, key, manager=manager) for tx in txs]
+    return encode_batch_tx([signed.rawTransaction for signed in signed_txs])
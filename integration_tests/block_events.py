@@ -0,0 +1,480 @@
+import asyncio
+import base64
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import requests
+import websockets
+from dateutil.parser import isoparse
+
+# the header event carries what we need without the block txs
+NEW_BLOCK_QUERY = "tm.event='NewBlockHeader'"
+TX_QUERY = "tm.event='Tx'"
+# the results of the txs nobody is waiting for yet
+MAX_RECENT_TXS = 10000
+
+_subscribers = {}
+_tx_subscribers = {}
+_subscribers_lock = threading.Lock()
+
+
+class Subscriber:
+    """
+    the subscription on the tendermint rpc websocket of a node, served by an event
+    loop in a background thread until `close` is called.
+
+    the subclasses implement `_loop`, and start the thread with `_start` after
+    the states are initialized.
+    """
+
+    def __init__(self, rpc_url, reconnect_interval=1):
+        self.rpc_url = rpc_url
+        self.ws_url = rpc_url.replace("http://", "ws://", 1) + "/websocket"
+        self.reconnect_interval = reconnect_interval
+        self.closed = False
+
+    def _start(self):
+        self._event_loop = asyncio.new_event_loop()
+        self._task = self._event_loop.create_task(self._loop())
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            self._event_loop.run_until_complete(self._task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._event_loop.close()
+
+    async def _loop(self):
+        raise NotImplementedError
+
+    def close(self):
+        "stop the background thread, the connection is closed"
+        with self._cond:
+            if self.closed:
+                return
+            self.closed = True
+            self._cond.notify_all()
+        self._event_loop.call_soon_threadsafe(self._task.cancel)
+        self._thread.join()
+
+
+class NewBlockSubscriber(Subscriber):
+    """
+    keep a `NewBlock` subscription open on the tendermint rpc websocket of a node
+    in a background thread, so waiting for blocks don't need to poll the node.
+
+    it reconnects automatically when the node restarts, callers should fallback
+    to polling when `wait` returns `None`.
+    """
+
+    def __init__(self, rpc_url, reconnect_interval=1):
+        super().__init__(rpc_url, reconnect_interval)
+        self.connected = False
+        # the connection is known to be unavailable, until the next connection
+        self.down = False
+        # (height, block time) of the latest block seen
+        self.latest = None
+        self._cond = threading.Condition()
+        self._start()
+
+    async def _loop(self):
+        while True:
+            try:
+                async with websockets.connect(self.ws_url) as ws:
+                    await ws.send(
+                        json.dumps(
+                            {
+                                "jsonrpc": "2.0",
+                                "method": "subscribe",
+                                "id": 0,
+                                "params": {"query": NEW_BLOCK_QUERY},
+                            }
+                        )
+                    )
+                    # subscribe before query the status to not miss any blocks
+                    status = await asyncio.get_running_loop().run_in_executor(
+                        None, self._query_status
+                    )
+                    with self._cond:
+                        # the status is authoritative, the node could be replaced
+                        # by a new chain on the same port
+                        self.latest = None
+                        self._update(
+                            int(status["latest_block_height"]),
+                            status["latest_block_time"],
+                        )
+                        self.connected = True
+                        self.down = False
+                        self._cond.notify_all()
+                    async for msg in ws:
+                        header = self._parse_header(json.loads(msg))
+                        if header is None:
+                            continue
+                        with self._cond:
+                            self._update(int(header["height"]), header["time"])
+                            self._cond.notify_all()
+            except (OSError, websockets.WebSocketException, requests.RequestException):
+                pass
+            with self._cond:
+                self.connected = False
+                self.down = True
+                self._cond.notify_all()
+            await asyncio.sleep(self.reconnect_interval)
+
+    def close(self):
+        super().close()
+        with self._cond:
+            self.connected = False
+            self.down = True
+            self._cond.notify_all()
+
+    def _query_status(self):
+        rsp = requests.get(f"{self.rpc_url}/status", timeout=5)
+        rsp.raise_for_status()
+        return rsp.json()["result"]["sync_info"]
+
+    @staticmethod
+    def _parse_header(msg):
+        try:
+            return msg["result"]["data"]["value"]["header"]
+        except (KeyError, TypeError):
+            # the subscription confirmation
+            return None
+
+    def reset(self):
+        "forget the latest block, the node is replaced by a new chain"
+        with self._cond:
+            self.latest = None
+            # until the status of the new chain is queried after the reconnection
+            self.connected = False
+            self.down = True
+            self._cond.notify_all()
+
+    def _update(self, height, block_time):
+        if self.latest is None or height > self.latest[0]:
+            self.latest = (height, isoparse(block_time))
+
+    def wait(self, predicate, timeout, connect_timeout=2):
+        """
+        block until `predicate(height, block_time)` holds for the latest block.
+
+        return the latest `(height, block_time)`, or `None` if the subscription is
+        not available, raise `TimeoutError` on timeout, `None` timeout waits forever.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            if not self.connected and not self.down:
+                # the first connection is in progress
+                self._cond.wait(connect_timeout)
+            while True:
+                if not self.connected:
+                    return None
+                if predicate(*self.latest):
+                    return self.latest
+                if deadline is None:
+                    self._cond.wait()
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(
+                        f"wait for blocks timeout, latest: {self.latest}"
+                    )
+                self._cond.wait(remaining)
+
+
+class TxSubscriber(Subscriber):
+    """
+    keep a `Tx` subscription open on the tendermint rpc websocket of a node in a
+    background thread, and resolve the futures of the broadcasted txs when they
+    are committed.
+
+    the txs are only broadcasted when the subscription is live, the txs pending
+    during a reconnection are queried by hash after the subscription is restored,
+    so no results are lost when the node restarts.
+    """
+
+    def __init__(self, rpc_url, workers=16, reconnect_interval=1):
+        super().__init__(rpc_url, reconnect_interval)
+        self.executor = ThreadPoolExecutor(workers)
+        # txhash -> future
+        self._pending = {}
+        # txhash -> result, committed before anyone waits for them
+        self._recent = OrderedDict()
+        # the subscription is confirmed, increased on every reconnect
+        self.live = False
+        self.epoch = 0
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._start()
+
+    async def _loop(self):
+        while True:
+            try:
+                async with websockets.connect(self.ws_url, max_size=None) as ws:
+                    await ws.send(
+                        json.dumps(
+                            {
+                                "jsonrpc": "2.0",
+                                "method": "subscribe",
+                                "id": 0,
+                                "params": {"query": TX_QUERY},
+                            }
+                        )
+                    )
+                    # the events are delivered after the confirmation
+                    rsp = json.loads(await ws.recv())
+                    if "error" in rsp:
+                        raise websockets.WebSocketException(rsp["error"])
+                    with self._cond:
+                        self.live = True
+                        self.epoch += 1
+                        self._cond.notify_all()
+                    await asyncio.get_running_loop().run_in_executor(
+                        None, self._recover
+                    )
+                    async for msg in ws:
+                        item = self._parse_tx(json.loads(msg))
+                        if item is not None:
+                            self._resolve(*item)
+            except (OSError, websockets.WebSocketException, requests.RequestException):
+                pass
+            with self._cond:
+                self.live = False
+            await asyncio.sleep(self.reconnect_interval)
+
+    def close(self):
+        "fail the txs still waiting, the ones not broadcasted yet are failed too"
+        super().close()
+        with self._lock:
+            self.live = False
+            pending, self._pending = self._pending, {}
+        self.executor.shutdown(wait=False)
+        for fut in pending.values():
+            fut.set_exception(ConnectionError(f"tx subscriber closed: {self.ws_url}"))
+
+    def _query(self, txhash):
+        "resolve the tx if it's already committed"
+        rsp = requests.get(
+            f"{self.rpc_url}/tx", params={"hash": f"0x{txhash}"}, timeout=5
+        ).json()
+        if "result" in rsp:
+            result = rsp["result"]
+            self._resolve(
+                txhash, tx_result(txhash, result["height"], result["tx_result"])
+            )
+
+    def _recover(self):
+        "query the pending txs which might be committed while disconnected"
+        with self._lock:
+            txhashes = list(self._pending)
+        for txhash in txhashes:
+            self._query(txhash)
+
+    @staticmethod
+    def _parse_tx(msg):
+        try:
+            txhash = msg["result"]["events"]["tx.hash"][0]
+            value = msg["result"]["data"]["value"]["TxResult"]
+        except (KeyError, TypeError):
+            # the subscription confirmation
+            return None
+        return txhash.upper(), tx_result(txhash, value["height"], value["result"])
+
+    def _resolve(self, txhash, result):
+        with self._lock:
+            fut = self._pending.pop(txhash, None)
+            if fut is None:
+                self._recent[txhash] = result
+                while len(self._recent) > MAX_RECENT_TXS:
+                    self._recent.popitem(last=False)
+                return
+        fut.set_result(result)
+
+    def wait_live(self, timeout):
+        "wait for the subscription, return the epoch of it"
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.live or self.closed, timeout):
+                raise TimeoutError(f"tx subscription is not available: {self.ws_url}")
+            if self.closed:
+                raise ConnectionError(f"tx subscriber closed: {self.ws_url}")
+            return self.epoch
+
+    def track(self, txhash, fut=None, epoch=None):
+        """
+        return a future of the result of the broadcasted tx.
+
+        epoch: the subscription epoch when the tx is broadcasted, the tx is queried
+        by hash if the subscription is not the same one, or unknown.
+        """
+        txhash = txhash.upper()
+        if fut is None:
+            fut = Future()
+        with self._lock:
+            if self.closed:
+                fut.set_exception(
+                    ConnectionError(f"tx subscriber closed: {self.ws_url}")
+                )
+                return fut
+            result = self._recent.pop(txhash, None)
+            if result is None:
+                self._pending[txhash] = fut
+                missed = epoch is None or epoch != self.epoch
+        if result is not None:
+            fut.set_result(result)
+        elif missed:
+            # the tx could be committed before the current subscription is live,
+            # while the previous one is not delivering it.
+            try:
+                self._query(txhash)
+            except requests.RequestException:
+                # the pending txs are queried again after the reconnection
+                pass
+        return fut
+
+    def submit(self, fn, *args, connect_timeout=10, **kwargs):
+        """
+        call the tx function in the background with the sync broadcast mode,
+        return a future of the tx result after it's committed, or the broadcast
+        response if it's rejected by `CheckTx`.
+        """
+        fut = Future()
+
+        def broadcast():
+            try:
+                # the tx is committed after the subscription is live
+                epoch = self.wait_live(connect_timeout)
+                rsp = fn(*args, broadcast_mode="sync", **kwargs)
+            except Exception as e:
+                fut.set_exception(e)
+                return
+            if rsp["code"] != 0:
+                fut.set_result(rsp)
+            else:
+                self.track(rsp["txhash"], fut, epoch)
+
+        self.executor.submit(broadcast)
+        return fut
+
+
+def decode_events(events):
+    "decode the base64 attributes of the tendermint events"
+    return [
+        {
+            "type": ev["type"],
+            "attributes": [
+                {
+                    "key": _b64decode(attr["key"]),
+                    "value": _b64decode(attr["value"]),
+                }
+                for attr in ev["attributes"]
+            ],
+        }
+        for ev in events
+    ]
+
+
+def _b64decode(s):
+    return None if s is None else base64.b64decode(s.encode()).decode()
+
+
+def message_logs(events):
+    """
+    rebuild the message logs from the decoded tx events like `ABCIMessageLogs`:
+    the events of each message start with a `message` event with the `action`
+    attribute, the events before the first one are emitted by the ante handler,
+    the events of the same type are merged like `StringifyEvents`.
+    """
+    logs = []
+    for ev in events:
+        if ev["type"] == "message" and any(
+            attr["key"] == "action" for attr in ev["attributes"]
+        ):
+            logs.append({"msg_index": len(logs), "log": "", "events": {}})
+        if logs:
+            merged = logs[-1]["events"].setdefault(
+                ev["type"], {"type": ev["type"], "attributes": []}
+            )
+            merged["attributes"].extend(ev["attributes"])
+    for log in logs:
+        log["events"] = list(log["events"].values())
+    return logs
+
+
+def tx_result(txhash, height, result):
+    """
+    same fields as the tx response of the block broadcast mode,
+    the `events` are the raw ones with base64 attributes, like the cli outputs.
+    """
+    events = result.get("events", [])
+    # the zero values are omitted in the json
+    code = result.get("code", 0)
+    return {
+        "txhash": txhash.upper(),
+        "height": int(height),
+        "code": code,
+        "codespace": result.get("codespace", ""),
+        "raw_log": result.get("log", ""),
+        # the failed txs don't have the message logs
+        "logs": message_logs(decode_events(events)) if code == 0 else [],
+        "gas_wanted": int(result.get("gas_wanted", 0)),
+        "gas_used": int(result.get("gas_used", 0)),
+        "events": events,
+    }
+
+
+def _rpc_url(cli):
+    node_rpc = getattr(cli, "node_rpc", None)
+    if not node_rpc or not node_rpc.startswith("tcp://"):
+        return None
+    return node_rpc.replace("tcp://", "http://", 1)
+
+
+def block_subscriber(cli):
+    """
+    return the shared subscriber of the node the cli connects to,
+    return `None` if the cli don't have a tendermint rpc address.
+    """
+    rpc_url = _rpc_url(cli)
+    if rpc_url is None:
+        return None
+    with _subscribers_lock:
+        if rpc_url not in _subscribers:
+            _subscribers[rpc_url] = NewBlockSubscriber(rpc_url)
+        return _subscribers[rpc_url]
+
+
+def reset_block_subscriber(rpc_url):
+    "reset the shared subscriber of the node if there's one"
+    with _subscribers_lock:
+        subscriber = _subscribers.get(rpc_url)
+    if subscriber is not None:
+        subscriber.reset()
+
+
+def close_subscribers(rpc_urls):
+    "close the shared subscribers of the nodes, when the network is stopped"
+    closing = []
+    with _subscribers_lock:
+        for subscribers in (_subscribers, _tx_subscribers):
+            for rpc_url in rpc_urls:
+                subscriber = subscribers.pop(rpc_url, None)
+                if subscriber is not None:
+                    closing.append(subscriber)
+    for subscriber in closing:
+        subscriber.close()
+
+
+def tx_subscriber(cli):
+    "return the shared tx subscriber of the node the cli connects to"
+    rpc_url = _rpc_url(cli)
+    assert rpc_url is not None, f"no tendermint rpc address: {cli.node_rpc}"
+    with _subscribers_lock:
+        if rpc_url not in _tx_subscribers:
+            _tx_subscribers[rpc_url] = TxSubscriber(rpc_url)
+        return _tx_subscribers[rpc_url]
@@ -0,0 +1,269 @@
+import bisect
+import os
+import re
+import struct
+import zlib
+from collections import namedtuple
+from pathlib import Path
+
+# same as the constants in `versiondb/client/changeset.go`
+ZLIB_FILE_SUFFIX = ".zz"
+SNAPPY_FILE_SUFFIX = ".snappy"
+INDEX_FILE_SUFFIX = ".index"
+# the go commands treat every file in the store directories as change set file,
+# so the index files are kept in a separate directory: `{changeset_dir}/.index/{store}`
+INDEX_DIR = ".index"
+# version(int64) + payload size(int64), little endian
+VERSION_HEADER = struct.Struct("<qq")
+# version(int64) + offset of the version header in the uncompressed stream(int64)
+INDEX_ENTRY = struct.Struct("<qq")
+CHUNK_FILE = re.compile(r"^block-(\d+)")
+READ_CHUNK_SIZE = 1 << 20
+
+KVPair = namedtuple("KVPair", ["delete", "key", "value"])
+
+
+class DecompressReader:
+    """
+    file like reader which decompress the underlying file on the fly,
+    seeking forward is done by decompressing and discarding the data.
+    """
+
+    def __init__(self, fp, decompress):
+        self.fp = fp
+        self.decompress = decompress
+        self.buf = bytearray()
+        # read position in `buf`
+        self.off = 0
+        self.pos = 0
+
+    def read(self, n):
+        while len(self.buf) - self.off < n:
+            chunk = self.fp.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            del self.buf[: self.off]
+            self.off = 0
+            self.buf += self.decompress(chunk)
+        data = bytes(self.buf[self.off : self.off + n])
+        self.off += len(data)
+        self.pos += len(data)
+        return data
+
+    def seek(self, offset):
+        assert offset >= self.pos, "can't seek backward in compressed stream"
+        while self.pos < offset:
+            if not self.read(min(offset - self.pos, READ_CHUNK_SIZE)):
+                break
+
+    def tell(self):
+        return self.pos
+
+    def close(self):
+        self.fp.close()
+
+
+class PlainReader:
+    def __init__(self, fp):
+        self.fp = fp
+
+    def read(self, n):
+        return self.fp.read(n)
+
+    def seek(self, offset):
+        self.fp.seek(offset)
+
+    def tell(self):
+        return self.fp.tell()
+
+    def close(self):
+        self.fp.close()
+
+
+def open_changeset_file(path):
+    "open change set file, decompress zlib and snappy files automatically"
+    path = str(path)
+    fp = open(path, "rb")
+    if path.endswith(ZLIB_FILE_SUFFIX):
+        return DecompressReader(fp, zlib.decompressobj().decompress)
+    if path.endswith(SNAPPY_FILE_SUFFIX):
+        # python-snappy is only needed for the snappy files
+        import snappy
+
+        return DecompressReader(fp, snappy.StreamDecompressor().decompress)
+    return PlainReader(fp)
+
+
+def decode_uvarint(buf, offset):
+    "return the decoded uint64 and the offset after it"
+    result = 0
+    shift = 0
+    while True:
+        b = buf[offset]
+        offset += 1
+        result |= (b & 0x7F) << shift
+        if b < 0x80:
+            return result, offset
+        shift += 7
+
+
+def decode_changeset(payload):
+    """
+    decode the key-value pairs in the payload of a version:
+    delete(int8), keyLen(varint), key, [ valueLen(varint), value ]
+    """
+    offset = 0
+    while offset < len(payload):
+        delete = payload[offset] == 1
+        size, offset = decode_uvarint(payload, offset + 1)
+        key = payload[offset : offset + size]
+        offset += size
+        if delete:
+            yield KVPair(True, key, None)
+            continue
+        size, offset = decode_uvarint(payload, offset)
+        yield KVPair(False, key, payload[offset : offset + size])
+        offset += size
+    assert offset == len(payload), "read beyond payload size limit"
+
+
+def iter_changesets(reader, parse=True):
+    """
+    iterate the versions of change set in the reader,
+    yield `(version, offset, pairs)`, pairs is None if not `parse`,
+    only one version of payload is in memory at a time.
+
+    a truncated version at the end of file is ignored, same as the go version.
+    """
+    while True:
+        offset = reader.tell()
+        header = reader.read(VERSION_HEADER.size)
+        if len(header) < VERSION_HEADER.size:
+            return
+        version, size = VERSION_HEADER.unpack(header)
+        if not parse:
+            reader.seek(offset + VERSION_HEADER.size + size)
+            yield version, offset, None
+            continue
+        payload = reader.read(size)
+        if len(payload) < size:
+            return
+        yield version, offset, list(decode_changeset(payload))
+
+
+class ChangeSetFile:
+    """
+    a change set file produced by `changeset dump`, with a sidecar index file of
+    the version -> offset, so querying a version range don't need to decode the
+    versions before it, the compressed files still need to be decompressed
+    until the offset but the payloads are not decoded.
+    """
+
+    def __init__(self, path, index_path=None):
+        self.path = Path(path)
+        self.index_path = Path(
+            index_path
+            or self.path.parent.parent
+            / INDEX_DIR
+            / self.path.parent.name
+            / (self.path.name + INDEX_FILE_SUFFIX)
+        )
+        self._index = None
+
+    def open(self):
+        return open_changeset_file(self.path)
+
+    def iter(self, start=None, end=None):
+        """
+        yield `(version, pairs)` of the versions in range `[start, end]`,
+        both ends are optional.
+        """
+        reader = self.open()
+        try:
+            if start is not None:
+                offset = self.offset_of(start)
+                if offset is None:
+                    return
+                reader.seek(offset)
+            for version, _, pairs in iter_changesets(reader):
+                if end is not None and version > end:
+                    return
+                yield version, pairs
+        finally:
+            reader.close()
+
+    def index(self):
+        "load the sidecar index, build it if missing or outdated"
+        if self._index is None:
+            if (
+                self.index_path.exists()
+                and self.index_path.stat().st_mtime_ns >= self.path.stat().st_mtime_ns
+            ):
+                self._index = load_index(self.index_path)
+            else:
+                self._index = self.build_index()
+        return self._index
+
+    def build_index(self):
+        reader = self.open()
+        try:
+            index = [
+                (version, offset)
+                for version, offset, _ in iter_changesets(reader, parse=False)
+            ]
+        finally:
+            reader.close()
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_path.with_name(self.index_path.name + ".tmp")
+        with tmp.open("wb") as fp:
+            for entry in index:
+                fp.write(INDEX_ENTRY.pack(*entry))
+        os.replace(tmp, self.index_path)
+        return index
+
+    def offset_of(self, version):
+        "offset of the first version not less than `version`, None if not found"
+        index = self.index()
+        i = bisect.bisect_left(index, (version,))
+        return index[i][1] if i < len(index) else None
+
+    def first_version(self):
+        index = self.index()
+        return index[0][0] if index else None
+
+
+def load_index(path):
+    data = Path(path).read_bytes()
+    return [tuple(entry) for entry in INDEX_ENTRY.iter_unpack(data)]
+
+
+def store_changeset_files(store_dir):
+    "the change set files of a store directory, sorted by the first version"
+    files = []
+    for path in Path(store_dir).iterdir():
+        m = CHUNK_FILE.match(path.name)
+        if m:
+            files.append((int(m.group(1)), ChangeSetFile(path)))
+    return [f for _, f in sorted(files, key=lambda item: item[0])]
+
+
+def query_key_history(store_dir, key, start=None, end=None):
+    """
+    yield `(version, pair)` of all the writes to the key in the versions range
+    `[start, end]`, scan the change set files of a store from `changeset dump`.
+    """
+    files = [
+        (f.first_version(), f)
+        for f in store_changeset_files(store_dir)
+        if f.first_version() is not None
+    ]
+    for i, (first, f) in enumerate(files):
+        if end is not None and first > end:
+            break
+        # the file ends before the start version
+        if start is not None and i + 1 < len(files) and files[i + 1][0] <= start:
+            continue
+        for version, pairs in f.iter(start, end):
+            for pair in pairs:
+                if pair.key == key:
+                    yield version, pair
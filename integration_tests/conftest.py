@@ -4,15 +4,36 @@ from pathlib import Path
 
 import pytest
 
-from .network import setup_elysium, setup_custom_elysium, setup_geth
+from .network import ClusterPool, setup_custom_elysium, setup_elysium, setup_geth
 
 dir = os.path.dirname(os.path.realpath(__file__))
 sys.path.append(dir + "/protobuf")
 
 
+def pytest_addoption(parser):
+    parser.addoption(
+        "--benchmark",
+        action="store_true",
+        default=False,
+        help="run the benchmark test cases",
+    )
+
+
 def pytest_configure(config):
     config.addinivalue_line("markers", "slow: marks tests as slow")
     config.addinivalue_line("markers", "gravity: gravity bridge test cases")
+    config.addinivalue_line(
+        "markers", "benchmark: benchmark test cases, only run with --benchmark"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--benchmark"):
+        return
+    skip = pytest.mark.skip(reason="need --benchmark option to run")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
 
 
 @pytest.fixture(scope="session")
@@ -48,11 +69,19 @@ def elysium(request, tmp_path_factory):
     if enable_indexer:
         path = tmp_path_factory.mktemp("indexer")
         yield from setup_custom_elysium(
-            path, 27000, Path(__file__).parent / "configs/enable-indexer.jsonnet"
+            path, None, Path(__file__).parent / "configs/enable-indexer.jsonnet"
         )
     else:
         path = tmp_path_factory.mktemp("elysium")
-        yield from setup_elysium(path, 26650)
+        yield from setup_elysium(path, None)
+
+
+@pytest.fixture(scope="session")
+def cluster_pool(tmp_path_factory):
+    "networks shared by the modules with the same config"
+    pool = ClusterPool(tmp_path_factory)
+    yield pool
+    pool.close()
 
 
 @pytest.fixture(scope="session")
@@ -5,14 +5,25 @@ import json
 import os
 import subprocess
 import tempfile
+import threading
 
 import bech32
 from dateutil.parser import isoparse
 from pystarport.utils import build_cli_args_safe, format_doc_string, interact
 
+from .block_events import tx_subscriber
+
 # the default initial base fee used by integration tests
 DEFAULT_GAS_PRICE = "100000000000basetely"
 DEFAULT_GAS = "250000"
+# suffixes of the bech32 prefixes, appended to the account address prefix
+BECH32_SUFFIXES = {"acc": "", "val": "valoper", "cons": "valcons"}
+# the chains which don't follow the convention, like chain-main
+BECH32_PREFIXES = {"cro": {"acc": "cro", "val": "crocncl", "cons": "crocnclcons"}}
+
+# home directory -> {key name: account address}
+_keyrings = {}
+_keyrings_lock = threading.Lock()
 
 
 class ModuleAccount(enum.Enum):
@@ -72,9 +83,34 @@ class CosmosCLI:
         output = self.raw("tendermint", "show-node-id", home=self.data_dir)
         return output.decode().strip()
 
+    def keyring(self):
+        """
+        the account addresses of the keys in the keyring, loaded with a single
+        `keys list` and cached per home directory.
+        """
+        home = str(self.data_dir)
+        with _keyrings_lock:
+            keys = _keyrings.get(home)
+        if keys is None:
+            output = self.raw(
+                "keys",
+                "list",
+                home=self.data_dir,
+                output="json",
+                keyring_backend="test",
+            )
+            keys = {item["name"]: item["address"] for item in json.loads(output)}
+            with _keyrings_lock:
+                _keyrings[home] = keys
+        return keys
+
+    def invalidate_keyring(self):
+        with _keyrings_lock:
+            _keyrings.pop(str(self.data_dir), None)
+
     def delete_account(self, name):
         "delete wallet account in node's keyring"
-        return self.raw(
+        output = self.raw(
             "keys",
             "delete",
             name,
@@ -84,6 +120,8 @@ class CosmosCLI:
             output="json",
             keyring_backend="test",
         )
+        self.invalidate_keyring()
+        return output
 
     def create_account(self, name, mnemonic=None):
         "create new keypair in node's keyring"
@@ -107,6 +145,7 @@ class CosmosCLI:
                 keyring_backend="test",
                 stdin=mnemonic.encode() + b"\n",
             )
+        self.invalidate_keyring()
         return json.loads(output)
 
     def migrate_keystore(self):
@@ -242,6 +281,16 @@ class CosmosCLI:
         return float(coin["amount"])
 
     def address(self, name, bech="acc", field="address"):
+        if field == "address":
+            addr = self.keyring().get(name)
+            if addr is not None:
+                # same bytes with different prefixes
+                hrp, data = bech32.bech32_decode(addr)
+                if hrp in BECH32_PREFIXES:
+                    prefix = BECH32_PREFIXES[hrp][bech]
+                else:
+                    prefix = hrp + BECH32_SUFFIXES[bech]
+                return bech32.bech32_encode(prefix, data)
         output = self.raw(
             "keys",
             "show",
@@ -328,40 +377,25 @@ class CosmosCLI:
             )
         )
 
-    def delegate_amount(self, to_addr, amount, from_addr, gas_price=None):
-        if gas_price is None:
-            return json.loads(
-                self.raw(
-                    "tx",
-                    "staking",
-                    "delegate",
-                    to_addr,
-                    amount,
-                    "-y",
-                    home=self.data_dir,
-                    from_=from_addr,
-                    keyring_backend="test",
-                    chain_id=self.chain_id,
-                    node=self.node_rpc,
-                )
-            )
-        else:
-            return json.loads(
-                self.raw(
-                    "tx",
-                    "staking",
-                    "delegate",
-                    to_addr,
-                    amount,
-                    "-y",
-                    home=self.data_dir,
-                    from_=from_addr,
-                    keyring_backend="test",
-                    chain_id=self.chain_id,
-                    node=self.node_rpc,
-                    gas_prices=gas_price,
-                )
+    def delegate_amount(self, to_addr, amount, from_addr, gas_price=None, **kwargs):
+        if gas_price is not None:
+            kwargs["gas_prices"] = gas_price
+        return json.loads(
+            self.raw(
+                "tx",
+                "staking",
+                "delegate",
+                to_addr,
+                amount,
+                "-y",
+                home=self.data_dir,
+                from_=from_addr,
+                keyring_backend="test",
+                chain_id=self.chain_id,
+                node=self.node_rpc,
+                **kwargs,
             )
+        )
 
     # to_addr: croclcl1...  , from_addr: cro1...
     def unbond_amount(self, to_addr, amount, from_addr):
@@ -528,7 +562,24 @@ class CosmosCLI:
         with tempfile.NamedTemporaryFile("w") as fp:
             json.dump(tx, fp)
             fp.flush()
-            return self.broadcast_tx(fp.name)
+            return self.broadcast_tx(fp.name, **kwargs)
+
+    def submit(self, method, *args, **kwargs):
+        """
+        run the tx method, like `transfer` or `broadcast_tx_json`, with the sync
+        broadcast mode in the background, return a future of the tx result after
+        it's committed, the inclusion is tracked by a tx subscription shared by
+        the clis of the same node.
+
+        the txs of different signers can be submitted concurrently, the txs of the
+        same signer need explicit sequences, or wait for the previous one.
+
+        ```
+        futs = [cli.submit("transfer", name, addr, "1basetely") for name in names]
+        rsps = [fut.result(timeout=60) for fut in futs]
+        ```
+        """
+        return tx_subscriber(self).submit(getattr(self, method), *args, **kwargs)
 
     def unjail(self, addr):
         return json.loads(
@@ -0,0 +1,151 @@
+import base64
+
+import requests
+from dateutil.parser import isoparse
+from requests.adapters import HTTPAdapter
+
+from .cosmoscli import CosmosCLI
+
+
+class CosmosREST(CosmosCLI):
+    """
+    same apis as CosmosCLI, but the queries go through the node's REST api and
+    tendermint rpc over a pooled keep-alive session instead of spawning a new
+    process per call, txs and keyring operations still go through the cli.
+    """
+
+    def __init__(self, data_dir, node_rpc, cmd, api_url, rpc_url, pool_size=10):
+        super().__init__(data_dir, node_rpc, cmd)
+        self.api_url = api_url
+        self.rpc_url = rpc_url
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+
+    def close(self):
+        self.session.close()
+
+    def _get(self, url, height=None, **params):
+        headers = {}
+        if height:
+            headers["x-cosmos-block-height"] = str(height)
+        rsp = self.session.get(
+            url,
+            params={k: v for k, v in params.items() if v is not None},
+            headers=headers,
+        )
+        # keep the same failure semantic as `interact`
+        assert rsp.ok, f"{rsp.status_code} {rsp.reason}: {rsp.text}"
+        return rsp.json()
+
+    def rest(self, path, height=None, **params):
+        "GET from the grpc-gateway endpoints"
+        return self._get(self.api_url + path, height=height, **params)
+
+    def rpc(self, method, **params):
+        "GET from the tendermint rpc endpoints"
+        rsp = self._get(f"{self.rpc_url}/{method}", **params)
+        assert "error" not in rsp, rsp["error"]
+        return rsp["result"]
+
+    def broadcast_tx_bytes(self, tx_bytes, mode="BROADCAST_MODE_BLOCK"):
+        "broadcast an encoded tx through the REST api, return the tx response"
+        rsp = self.session.post(
+            self.api_url + "/cosmos/tx/v1beta1/txs",
+            json={"tx_bytes": base64.b64encode(tx_bytes).decode(), "mode": mode},
+        )
+        assert rsp.ok, f"{rsp.status_code} {rsp.reason}: {rsp.text}"
+        return rsp.json()["tx_response"]
+
+    def status(self):
+        rsp = self.rpc("status")
+        # same key names as `elysiumd status`
+        return {
+            "NodeInfo": rsp["node_info"],
+            "SyncInfo": rsp["sync_info"],
+            "ValidatorInfo": rsp["validator_info"],
+        }
+
+    def block_height(self):
+        return int(self.status()["SyncInfo"]["latest_block_height"])
+
+    def block_time(self):
+        return isoparse(self.status()["SyncInfo"]["latest_block_time"])
+
+    def balances(self, addr, height=0):
+        return self.rest(f"/cosmos/bank/v1beta1/balances/{addr}", height=height)[
+            "balances"
+        ]
+
+    def query_tx(self, tx_type, tx_value):
+        if tx_type != "hash":
+            return super().query_tx(tx_type, tx_value)
+        return self.rest(f"/cosmos/tx/v1beta1/txs/{tx_value}")["tx_response"]
+
+    def distribution_commission(self, addr):
+        coin = self.rest(f"/cosmos/distribution/v1beta1/validators/{addr}/commission")[
+            "commission"
+        ]["commission"][0]
+        return float(coin["amount"])
+
+    def distribution_community(self):
+        coin = self.rest("/cosmos/distribution/v1beta1/community_pool")["pool"][0]
+        return float(coin["amount"])
+
+    def distribution_reward(self, delegator_addr):
+        coin = self.rest(
+            f"/cosmos/distribution/v1beta1/delegators/{delegator_addr}/rewards"
+        )["total"][0]
+        return float(coin["amount"])
+
+    def account(self, addr):
+        return self.rest(f"/cosmos/auth/v1beta1/accounts/{addr}")["account"]
+
+    def total_supply(self):
+        return self.rest("/cosmos/bank/v1beta1/supply")
+
+    def validator(self, addr):
+        return self.rest(f"/cosmos/staking/v1beta1/validators/{addr}")["validator"]
+
+    def validators(self):
+        return self.rest("/cosmos/staking/v1beta1/validators")["validators"]
+
+    def staking_params(self):
+        return self.rest("/cosmos/staking/v1beta1/params")["params"]
+
+    def staking_pool(self, bonded=True):
+        return int(
+            self.rest("/cosmos/staking/v1beta1/pool")["pool"][
+                "bonded_tokens" if bonded else "not_bonded_tokens"
+            ]
+        )
+
+    def get_delegated_amount(self, which_addr):
+        return self.rest(f"/cosmos/staking/v1beta1/delegations/{which_addr}")
+
+    def query_proposal(self, proposal_id):
+        return self.rest(f"/cosmos/gov/v1/proposals/{proposal_id}")["proposal"]
+
+    def query_tally(self, proposal_id):
+        return self.rest(f"/cosmos/gov/v1/proposals/{proposal_id}/tally")["tally"]
+
+    def query_contract_by_denom(self, denom: str):
+        "query contract by denom"
+        return self.rest(f"/elysium/v1/contract_by_denom/{denom}")
+
+    def query_denom_by_contract(self, contract: str):
+        "query denom by contract"
+        return self.rest(f"/elysium/v1/denom_by_contract/{contract}")
+
+    def query_params(self):
+        "query elysium params"
+        return self.rest("/elysium/v1/params")["params"]
+
+    def query_permissions(self, address: str):
+        "query permissions for an address"
+        return self.rest("/elysium/v1/permissions", address=address)
+
+    def evm_params(self, **kwargs):
+        if kwargs:
+            return super().evm_params(**kwargs)
+        return self.rest("/ethermint/evm/v1/params")
@@ -1,8 +1,13 @@
 import base64
+import functools
 import json
 from pathlib import Path
 
 import sha3
+from eth_account import Account
+from eth_account._utils.structured_data.hashing import hash_domain, hash_message
+from eth_account.messages import SignableMessage
+from hexbytes import HexBytes
 
 from .protobuf.cosmos.bank.v1beta1.tx_pb2 import MsgSend
 from .protobuf.cosmos.base.v1beta1.coin_pb2 import Coin
@@ -92,7 +97,9 @@ def generate_fee(amount, denom, gas, fee_payer):
     }
 
 
+@functools.lru_cache()
 def generate_types():
+    "the result is cached, don't modify it"
     return json.loads((Path(__file__).parent / "msg_send_types.json").read_text())
 
 
@@ -195,6 +202,7 @@ def create_transaction_with_multiple_messages(
     chain_id,
 ):
     body = create_body_with_multiple_messages(messages, memo)
+    body_bytes = body.SerializeToString()
     fee_message = create_fee(fee, denom, gas_limit)
     pub_key_decoded = base64.b64decode(pub_key.encode("ascii"))
     # AMINO
@@ -206,7 +214,7 @@ def create_transaction_with_multiple_messages(
     )
     auth_info_amino = create_auth_info(sign_info_amino, fee_message)
     sig_doc_amino = create_sig_doc(
-        body.SerializeToString(),
+        body_bytes,
         auth_info_amino.SerializeToString(),
         chain_id,
         account_number,
@@ -225,7 +233,7 @@ def create_transaction_with_multiple_messages(
     )
     auth_info_direct = create_auth_info(sig_info_direct, fee_message)
     sign_doc_direct = create_sig_doc(
-        body.SerializeToString(),
+        body_bytes,
         auth_info_direct.SerializeToString(),
         chain_id,
         account_number,
@@ -354,3 +362,89 @@ def create_tx_raw_eip712(body, auth_info, extension):
         auth_info.SerializeToString(),
         [bytes()],
     )
+
+
+class Eip712TxBuilder:
+    """
+    build and sign EIP-712 txs of a single sender in bulk,
+    the type schema, domain separator hash, signer public key and fee are
+    prepared once and reused for every tx.
+    """
+
+    def __init__(self, chain, sender, fee, memo="", algo="ethsecp256"):
+        self.chain = chain
+        self.sender = sender
+        self.memo = memo
+        self.fee_object = generate_fee(
+            fee["amount"], fee["denom"], fee["gas"], sender["accountAddress"]
+        )
+        self.fee_message = create_fee(fee["amount"], fee["denom"], fee["gas"])
+        self.types = generate_types()
+        self.domain = create_eip712(self.types, chain["chainId"], None)["domain"]
+        self.domain_hash = hash_domain({"types": self.types, "domain": self.domain})
+        self.pub_key = base64.b64decode(sender["pubkey"].encode("ascii"))
+        self.algo = algo
+
+    def sign(self, msgs, proto_msgs, sequence, key):
+        "sign the messages with the sequence, return the `TxRaw` bytes"
+        message = generate_message_with_multiple_transactions(
+            str(self.sender["accountNumber"]),
+            str(sequence),
+            self.chain["cosmosChainId"],
+            self.memo,
+            self.fee_object,
+            msgs,
+        )
+        msg_hash = hash_message(
+            {"types": self.types, "primaryType": "Tx", "message": message}
+        )
+        signed = Account.sign_message(
+            SignableMessage(HexBytes(b"\x01"), self.domain_hash, msg_hash), key
+        )
+        extension = signature_to_web3_extension(
+            self.chain, self.sender, signed.signature
+        )
+        auth_info = create_auth_info(
+            create_signer_info(self.algo, self.pub_key, sequence, LEGACY_AMINO),
+            self.fee_message,
+        )
+        body = create_body_with_multiple_messages(proto_msgs, self.memo)
+        return create_tx_raw_eip712(body, auth_info, extension)[
+            "message"
+        ].SerializeToString()
+
+    def msg_send(self, params, sequence, key):
+        "sign a `MsgSend` tx"
+        from_address = self.sender["accountAddress"]
+        return self.sign(
+            [
+                create_msg_send(
+                    params["amount"],
+                    params["denom"],
+                    from_address,
+                    params["destinationAddress"],
+                )
+            ],
+            [
+                proto_msg_send(
+                    from_address,
+                    params["destinationAddress"],
+                    params["amount"],
+                    params["denom"],
+                )
+            ],
+            sequence,
+            key,
+        )
+
+    def batch_msg_send(self, params_list, key, sequence=None):
+        """
+        sign a `MsgSend` tx for each params with incrementing sequence,
+        starting from the sender's sequence by default.
+        """
+        if sequence is None:
+            sequence = self.sender["sequence"]
+        return [
+            self.msg_send(params, sequence + i, key)
+            for i, params in enumerate(params_list)
+        ]
@@ -0,0 +1,295 @@
+import hashlib
+import json
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import bech32
+from eth_utils import keccak, to_bytes, to_checksum_address
+
+ETH_ACCOUNT_TYPE = "/ethermint.types.v1.EthAccount"
+EMPTY_CODE_HASH = "0x" + keccak(b"").hex()
+# returns 42, the code is not important, only the size of the state
+DEFAULT_CODE = bytes.fromhex("602a60005260206000f3")
+GENERATE_CHUNK_SIZE = 10000
+MARKER = re.compile(r'("__generated_\d+__")')
+
+
+def synthetic_address(kind, i):
+    "deterministic 20 bytes address, different kinds don't collide"
+    return hashlib.sha256(f"{kind}-{i}".encode()).digest()[:20]
+
+
+def _bech32(addr, prefix):
+    return bech32.bech32_encode(prefix, bech32.convertbits(addr, 8, 5))
+
+
+def _slot(n):
+    return "0x" + n.to_bytes(32, "big").hex()
+
+
+def _base_account(acct):
+    if "base_vesting_account" in acct:
+        return acct["base_vesting_account"]["base_account"]
+    return acct.get("base_account", acct)
+
+
+def _account_number(acct):
+    return int(_base_account(acct).get("account_number", 0))
+
+
+def genesis_prefix(app_state):
+    "the bech32 account prefix of the chain, from the existing genesis accounts"
+    for acct in app_state["auth"]["accounts"]:
+        address = _base_account(acct).get("address")
+        if address:
+            prefix, _ = bech32.bech32_decode(address)
+            assert prefix, f"invalid bech32 address: {address}"
+            return prefix
+    raise AssertionError("no accounts in the genesis to derive the bech32 prefix")
+
+
+def _next_account_number(app_state):
+    return max(map(_account_number, app_state["auth"]["accounts"]), default=0) + 1
+
+
+def _add_supply(supply, coins, n):
+    "add `n` times the coins to the supply, the supply is empty if it's computed"
+    if not supply:
+        return
+    for coin in coins:
+        amount = int(coin["amount"]) * n
+        for total in supply:
+            if total["denom"] == coin["denom"]:
+                total["amount"] = str(int(total["amount"]) + amount)
+                break
+        else:
+            supply.append({"denom": coin["denom"], "amount": str(amount)})
+    supply.sort(key=lambda coin: coin["denom"])
+
+
+def _list_at(obj, keys):
+    for key in keys[:-1]:
+        obj = obj.setdefault(key, {})
+    return obj.setdefault(keys[-1], [])
+
+
+def eth_account(addr, number, prefix, code_hash=EMPTY_CODE_HASH):
+    return {
+        "@type": ETH_ACCOUNT_TYPE,
+        "base_account": {
+            "address": _bech32(addr, prefix),
+            "pub_key": None,
+            "account_number": str(number),
+            "sequence": "0",
+        },
+        "code_hash": code_hash,
+    }
+
+
+def account_item(i, number, prefix):
+    return eth_account(synthetic_address("account", i), number + i, prefix)
+
+
+def contract_account_item(i, number, prefix, code_hash):
+    return eth_account(synthetic_address("contract", i), number + i, prefix, code_hash)
+
+
+def balance_item(i, coins, prefix):
+    return {
+        "address": _bech32(synthetic_address("account", i), prefix),
+        "coins": coins,
+    }
+
+
+def evm_item(i, code, slots):
+    return {
+        "address": to_checksum_address(synthetic_address("contract", i)),
+        "code": code,
+        "storage": [
+            {"key": _slot(j), "value": _slot(i * slots + j + 1)} for j in range(slots)
+        ],
+    }
+
+
+def token_mapping_item(i):
+    token = to_checksum_address(synthetic_address("token", i))
+    return {
+        "denom": f"gravity{token}",
+        "contract": to_checksum_address(synthetic_address("contract", i)),
+    }
+
+
+def _encode_range(fn, begin, end, args):
+    return ",".join(json.dumps(fn(i, *args)) for i in range(begin, end))
+
+
+def encode_items(executor, fn, n, *args, window=8):
+    """
+    the json fragments of `fn(i, *args)` for `i` in `range(n)`, encoded in chunks,
+    at most `window` chunks are pending, to bound the memory usage.
+    """
+    pending = deque()
+    for begin in range(0, n, GENERATE_CHUNK_SIZE):
+        end = min(begin + GENERATE_CHUNK_SIZE, n)
+        pending.append(executor.submit(_encode_range, fn, begin, end, args))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def write_genesis(path, genesis, sections):
+    """
+    write the genesis json with the fragments appended to the lists,
+    the fragments are written as they come, never hold in memory together.
+
+    sections: `[(keys, fragments)]`, keys is the path of the list in the genesis,
+    fragments are the comma separated json items.
+    """
+    generators = {}
+    for i, (keys, fragments) in enumerate(sections):
+        marker = f"__generated_{i}__"
+        # the items are written after the existing ones
+        _list_at(genesis, keys).append(marker)
+        generators[json.dumps(marker)] = fragments
+    text = json.dumps(genesis)
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("w") as fp:
+        for part in MARKER.split(text):
+            if part not in generators:
+                fp.write(part)
+                continue
+            # the separator before the marker is already written,
+            # so the sections must not be empty
+            for i, fragment in enumerate(generators[part]):
+                if i:
+                    fp.write(",")
+                fp.write(fragment)
+    os.replace(tmp, path)
+
+
+def generate_large_genesis(
+    genesis_path,
+    accounts=0,
+    contracts=0,
+    slots=0,
+    token_mappings=0,
+    amount=10**18,
+    denom="basetely",
+    code=DEFAULT_CODE,
+    prefix=None,
+    processes=None,
+):
+    """
+    append synthetic state to a genesis file:
+
+    - `accounts` funded eth accounts, in auth and bank
+    - `contracts` evm contracts with `slots` storage slots each
+    - `token_mappings` gravity denoms mapped to the contracts
+
+    the items are encoded in a process pool, and streamed to the file.
+
+    prefix: the bech32 account prefix, default to the one of the genesis accounts.
+    """
+    assert token_mappings <= contracts, "token mappings need the contracts"
+    genesis = json.loads(Path(genesis_path).read_text())
+    app_state = genesis["app_state"]
+    prefix = prefix or genesis_prefix(app_state)
+    number = _next_account_number(app_state)
+    coins = [{"denom": denom, "amount": str(amount)}]
+    _add_supply(app_state["bank"]["supply"], coins, accounts)
+
+    code_hash = "0x" + keccak(code).hex()
+    with ProcessPoolExecutor(processes) as executor:
+        # the generators submit the chunks lazily, one section at a time
+        sections = []
+        if accounts or contracts:
+            auth_accounts = (
+                fragment
+                for fn, n, args in [
+                    (account_item, accounts, (number, prefix)),
+                    (
+                        contract_account_item,
+                        contracts,
+                        (number + accounts, prefix, code_hash),
+                    ),
+                ]
+                for fragment in encode_items(executor, fn, n, *args)
+            )
+            sections.append((["app_state", "auth", "accounts"], auth_accounts))
+        if accounts:
+            sections.append(
+                (
+                    ["app_state", "bank", "balances"],
+                    encode_items(executor, balance_item, accounts, coins, prefix),
+                )
+            )
+        if contracts:
+            sections.append(
+                (
+                    ["app_state", "evm", "accounts"],
+                    encode_items(executor, evm_item, contracts, code.hex(), slots),
+                )
+            )
+        if token_mappings:
+            sections.append(
+                (
+                    ["app_state", "elysium", "external_contracts"],
+                    encode_items(executor, token_mapping_item, token_mappings),
+                )
+            )
+        write_genesis(genesis_path, genesis, sections)
+
+
+def add_genesis_accounts(genesis_path, addresses, coins, prefix=None):
+    """
+    fund the eth addresses at genesis, the auth accounts and the bank balances are
+    appended to the genesis file directly, rather than one `add-genesis-account`
+    command per account.
+
+    coins: like `[{"denom": "basetely", "amount": "1000"}]`, sorted by denom.
+    prefix: the bech32 account prefix, default to the one of the genesis accounts.
+    """
+    assert addresses, "no accounts to add"
+    genesis = json.loads(Path(genesis_path).read_text())
+    app_state = genesis["app_state"]
+    prefix = prefix or genesis_prefix(app_state)
+    number = _next_account_number(app_state)
+    _add_supply(app_state["bank"]["supply"], coins, len(addresses))
+    addresses = [to_bytes(hexstr=address) for address in addresses]
+    write_genesis(
+        genesis_path,
+        genesis,
+        [
+            (
+                ["app_state", "auth", "accounts"],
+                (
+                    json.dumps(eth_account(address, number + i, prefix))
+                    for i, address in enumerate(addresses)
+                ),
+            ),
+            (
+                ["app_state", "bank", "balances"],
+                (
+                    json.dumps({"address": _bech32(address, prefix), "coins": coins})
+                    for address in addresses
+                ),
+            ),
+        ],
+    )
+
+
+def large_genesis_post_init(chain_id="elysium_777-1", **kwargs):
+    """
+    return a `post_init` hook which appends the synthetic state to the genesis,
+    the nodes' genesis files are symlinks to the shared one.
+    """
+
+    def post_init(path, base_port, config):
+        generate_large_genesis(path / chain_id / "genesis.json", **kwargs)
+
+    return post_init
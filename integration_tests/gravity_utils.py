@@ -16,6 +16,7 @@ from .utils import (
     dump_toml,
     get_contract,
     send_transaction,
+    send_transactions,
     wait_for_new_blocks,
 )
 
@@ -63,11 +64,11 @@ def prepare_gravity(custom_elysium, custom_geth):
     """
     chain_id = "elysium_777-1"
     w3 = custom_geth.w3
-    # set-delegate-keys
-    for i, val in enumerate(custom_elysium.config["validators"]):
+
+    def generate_keys(i):
         # generate gorc config file
         gorc_config_path = custom_elysium.base_dir / f"node{i}/gorc.toml"
-        grpc_port = ports.grpc_port(val["base_port"])
+        grpc_port = ports.grpc_port(custom_elysium.base_port(i))
         metrics_port = 3000 + i
         gorc_config_path.write_text(
             dump_toml(
@@ -86,18 +87,33 @@ def prepare_gravity(custom_elysium, custom_geth):
         # generate new accounts on both chain
         gorc.add_eth_key("eth")
         gorc.add_eth_key("elysium")  # elysium and eth key derivation are the same
-
-        # fund the orchestrator accounts
         eth_addr = to_checksum_address(gorc.show_eth_addr("eth"))
-        print("fund 0.1 eth to address", eth_addr)
-        send_transaction(w3, {"to": eth_addr, "value": 10**17}, KEYS["validator"])
         acc_addr = gorc.show_cosmos_addr("elysium")
+        return gorc, eth_addr, acc_addr
+
+    # set-delegate-keys
+    orchestrators = custom_elysium.for_each_node(generate_keys)
+
+    # fund the orchestrator accounts, the funders are shared, so not concurrently
+    print("fund 0.1 eth to addresses", [eth_addr for _, eth_addr, _ in orchestrators])
+    receipts = send_transactions(
+        w3,
+        [
+            {"to": eth_addr, "value": 10**17, "gas": 21000}
+            for _, eth_addr, _ in orchestrators
+        ],
+        KEYS["validator"],
+    )
+    assert all(receipt.status == 1 for receipt in receipts)
+    for _, _, acc_addr in orchestrators:
         print("fund 100fury to address", acc_addr)
         rsp = custom_elysium.cosmos_cli().transfer(
             "community", acc_addr, "%dbasetely" % (100 * (10**18))
         )
         assert rsp["code"] == 0, rsp["raw_log"]
 
+    def set_delegate_keys(i):
+        gorc, eth_addr, acc_addr = orchestrators[i]
         cli = custom_elysium.cosmos_cli(i)
         val_addr = cli.address("validator", bech="val")
         val_acct_addr = cli.address("validator")
@@ -107,6 +123,9 @@ def prepare_gravity(custom_elysium, custom_geth):
             val_addr, acc_addr, eth_addr, HexBytes(signature).hex(), from_=val_acct_addr
         )
         assert rsp["code"] == 0, rsp["raw_log"]
+
+    custom_elysium.for_each_node(set_delegate_keys)
+    cli = custom_elysium.cosmos_cli()
     # wait for gravity signer tx get generated
     wait_for_new_blocks(cli, 2)
 
@@ -3,10 +3,11 @@ import subprocess
 from pathlib import Path
 from typing import NamedTuple
 
+import _jsonnet
 from pystarport import ports
 
 from .network import Chainmain, Elysium, Hermes, setup_custom_elysium
-from .utils import ADDRS, eth_to_bech32, wait_for_port
+from .utils import ADDRS, allocate_base_port, eth_to_bech32, wait_for_port
 
 RATIO = 10**10
 
@@ -18,9 +19,43 @@ class IBCNetwork(NamedTuple):
     incentivized: bool
 
 
+def override_ports(tmp_path, config, base_port):
+    """
+    the chainmain validators and the relayer ports are fixed in the ibc configs,
+    move them into the port range allocated for the network.
+    """
+    # the dotenv path is relative to the config file
+    dotenv = json.loads(_jsonnet.evaluate_file(str(config)))["dotenv"]
+    path = tmp_path / "ibc.jsonnet"
+    path.write_text(
+        f"""
+local config = import '{config}';
+
+config {{
+  dotenv: '{(config.parent / dotenv).resolve()}',
+  'chainmain-1'+: {{
+    validators: [
+      super.validators[i] {{ base_port: {base_port + 50} + i * 10 }}
+      for i in std.range(0, std.length(super.validators) - 1)
+    ],
+  }},
+  relayer+: {{
+    rest+: {{
+      port: {base_port + 90},
+    }},
+  }},
+}}
+"""
+    )
+    return path
+
+
 def prepare_network(tmp_path, file, incentivized=True, start_relay=True):
-    file = f"configs/{file}.jsonnet"
-    gen = setup_custom_elysium(tmp_path, 26700, Path(__file__).parent / file)
+    base_port = allocate_base_port(tmp_path)
+    file = Path(__file__).parent / f"configs/{file}.jsonnet"
+    gen = setup_custom_elysium(
+        tmp_path, base_port, override_ports(tmp_path, file, base_port)
+    )
     elysium = next(gen)
     chainmain = Chainmain(elysium.base_dir.parent / "chainmain-1")
     hermes = Hermes(elysium.base_dir.parent / "relayer.toml")
@@ -0,0 +1,312 @@
+import asyncio
+import json
+import time
+from pathlib import Path
+
+import aiohttp
+import websockets
+from eth_account import Account
+from hexbytes import HexBytes
+
+from .utils import NonceManager, send_transactions
+
+
+def percentile(values, p):
+    "nearest-rank percentile, `p` in [0, 100]"
+    if not values:
+        return None
+    values = sorted(values)
+    k = max(0, min(len(values) - 1, round(p / 100 * len(values)) - 1))
+    return values[k]
+
+
+def fund_accounts(w3, n, amount, key=None):
+    "create `n` new accounts and fund them with `amount` each, return the keys"
+    accounts = [Account.create() for i in range(n)]
+    receipts = send_transactions(
+        w3,
+        [{"to": acct.address, "value": amount, "gas": 21000} for acct in accounts],
+        key,
+    )
+    assert all(receipt.status == 1 for receipt in receipts)
+    return [acct.key for acct in accounts]
+
+
+def sign_load(w3, keys, total, build_tx):
+    """
+    sign `total` txs round-robin across the keys with locally tracked nonces,
+    `build_tx(i)` returns the i-th tx.
+    """
+    manager = NonceManager(w3)
+    return [
+        manager.sign(build_tx(i), keys[i % len(keys)]).rawTransaction
+        for i in range(total)
+    ]
+
+
+class LoadGenerator:
+    """
+    submit the pre-signed txs with `eth_sendRawTransaction` at the target rate,
+    track the inclusion through a `newHeads` subscription.
+    """
+
+    def __init__(self, http_endpoint, ws_endpoint):
+        self.http_endpoint = http_endpoint
+        self.ws_endpoint = ws_endpoint
+        self._gen_id = 0
+        # txhash -> submit time
+        self.submitted = {}
+        # txhash -> inclusion time
+        self.included = {}
+        self.errors = []
+        # (block number, tx count, gas used, gas limit)
+        self.blocks = []
+
+    def gen_id(self):
+        self._gen_id += 1
+        return self._gen_id
+
+    async def call(self, session, method, *params):
+        async with session.post(
+            self.http_endpoint,
+            json={
+                "jsonrpc": "2.0",
+                "id": self.gen_id(),
+                "method": method,
+                "params": params,
+            },
+        ) as rsp:
+            rsp = await rsp.json()
+        if "error" in rsp:
+            raise ValueError(rsp["error"])
+        return rsp["result"]
+
+    async def submit(self, session, raw):
+        begin = time.monotonic()
+        try:
+            txhash = await self.call(
+                session, "eth_sendRawTransaction", HexBytes(raw).hex()
+            )
+        except (ValueError, aiohttp.ClientError) as e:
+            self.errors.append(str(e))
+            return
+        self.submitted[txhash] = begin
+
+    async def track(self, session, ws):
+        "track the txs inclusion with the new block headers"
+        await ws.send(
+            json.dumps(
+                {"id": self.gen_id(), "method": "eth_subscribe", "params": ["newHeads"]}
+            )
+        )
+        async for msg in ws:
+            now = time.monotonic()
+            msg = json.loads(msg)
+            if msg.get("method") != "eth_subscription":
+                continue
+            head = msg["params"]["result"]
+            block = await self.call(
+                session, "eth_getBlockByNumber", head["number"], False
+            )
+            for txhash in block["transactions"]:
+                self.included.setdefault(txhash, now)
+            self.blocks.append(
+                (
+                    int(head["number"], 0),
+                    len(block["transactions"]),
+                    int(head["gasUsed"], 0),
+                    int(head["gasLimit"], 0),
+                )
+            )
+
+    async def run(self, raw_txs, tps, inclusion_timeout=60):
+        async with aiohttp.ClientSession() as session, websockets.connect(
+            self.ws_endpoint, max_size=None
+        ) as ws:
+            tracker = asyncio.create_task(self.track(session, ws))
+            begin = time.monotonic()
+            tasks = []
+            for i, raw in enumerate(raw_txs):
+                delay = begin + i / tps - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.create_task(self.submit(session, raw)))
+            await asyncio.gather(*tasks)
+            submit_end = time.monotonic()
+            deadline = submit_end + inclusion_timeout
+            while time.monotonic() < deadline and self.pending():
+                await asyncio.sleep(0.1)
+            tracker.cancel()
+            try:
+                await tracker
+            except asyncio.CancelledError:
+                pass
+        return self.report(begin, submit_end)
+
+    def pending(self):
+        return self.submitted.keys() - self.included.keys()
+
+    def report(self, begin, submit_end):
+        latencies = []
+        end = begin
+        for txhash, submit_time in self.submitted.items():
+            if txhash in self.included:
+                latencies.append(self.included[txhash] - submit_time)
+                end = max(end, self.included[txhash])
+        return {
+            "submitted": len(self.submitted),
+            "failed": len(self.errors),
+            "included": len(latencies),
+            "submit_tps": len(self.submitted) / max(submit_end - begin, 1e-9),
+            "achieved_tps": len(latencies) / max(end - begin, 1e-9),
+            "latency_p50": percentile(latencies, 50),
+            "latency_p99": percentile(latencies, 99),
+            "latency_max": max(latencies, default=None),
+            "blocks": [
+                {
+                    "number": number,
+                    "txs": ntxs,
+                    "gas_used": gas_used,
+                    "gas_fill": gas_used / gas_limit if gas_limit else None,
+                }
+                for number, ntxs, gas_used, gas_limit in self.blocks
+            ],
+        }
+
+
+def run_load(elysium, keys, tps, total, build_tx, i=0, inclusion_timeout=60):
+    "sign and send `total` txs at `tps` against the i-th node, return the report"
+    w3 = elysium.node_w3(i)
+    raw_txs = sign_load(w3, keys, total, build_tx)
+    gen = LoadGenerator(elysium.w3_http_endpoint(i), elysium.w3_ws_endpoint(i))
+    return asyncio.run(gen.run(raw_txs, tps, inclusion_timeout=inclusion_timeout))
+
+
+def latency_stats(latencies, errors, elapsed):
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "qps": len(latencies) / max(elapsed, 1e-9),
+        "latency_p50": percentile(latencies, 50),
+        "latency_p99": percentile(latencies, 99),
+        "latency_max": max(latencies, default=None),
+    }
+
+
+async def bench_rpc(endpoint, payloads, concurrency=16):
+    """
+    send the json-rpc requests through `concurrency` keep-alive connections
+    as fast as possible, return the throughput and latency stats.
+    """
+    latencies = []
+    errors = 0
+    it = iter(payloads)
+
+    async def worker(session):
+        nonlocal errors
+        for payload in it:
+            begin = time.monotonic()
+            try:
+                async with session.post(endpoint, json=payload) as rsp:
+                    rsp = await rsp.json()
+            except aiohttp.ClientError:
+                errors += 1
+                continue
+            if "error" in rsp:
+                errors += 1
+            else:
+                latencies.append(time.monotonic() - begin)
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        begin = time.monotonic()
+        await asyncio.gather(*[worker(session) for _ in range(concurrency)])
+        elapsed = time.monotonic() - begin
+    return latency_stats(latencies, errors, elapsed)
+
+
+def compare_rpc(endpoints, payloads, concurrency=16):
+    """
+    run the same requests against the endpoints concurrently,
+    `endpoints` is a dict of name -> endpoint, return a dict of name -> stats.
+    """
+
+    async def run():
+        stats = await asyncio.gather(
+            *[
+                bench_rpc(endpoint, payloads, concurrency)
+                for endpoint in endpoints.values()
+            ]
+        )
+        return dict(zip(endpoints, stats))
+
+    return asyncio.run(run())
+
+
+def load_baseline(path):
+    "load the benchmark results of a previous run, empty if not exists"
+    path = Path(path)
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text())
+
+
+def save_baseline(path, results):
+    "merge the results into the baseline file, the new results win"
+    path = Path(path)
+    baseline = load_baseline(path)
+    baseline.update(results)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(baseline, indent=2, sort_keys=True))
+    tmp.replace(path)
+
+
+def find_regressions(
+    results, baseline, metric="latency_p50", threshold=0.2, min_delta=0.005
+):
+    """
+    compare the metric of each case with the baseline, return the cases which are
+    slower by more than `threshold` in ratio and `min_delta` in seconds,
+    the absolute delta filters out the noise of the very fast cases.
+    """
+    regressions = {}
+    for name, stats in results.items():
+        base = baseline.get(name, {}).get(metric)
+        value = stats.get(metric)
+        if base is None or value is None:
+            continue
+        if value > base * (1 + threshold) and value - base > min_delta:
+            regressions[name] = {"baseline": base, "current": value}
+    return regressions
+
+
+def prometheus_metrics(session, url, suffixes):
+    """
+    scrape the prometheus text format metrics, return the values of the metrics
+    whose names end with the suffixes, summed over the labels, keyed by suffix.
+    """
+    rsp = session.get(url)
+    assert rsp.ok, f"{rsp.status_code} {rsp.reason}: {rsp.text}"
+    values = {}
+    for line in rsp.text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        name, _, value = line.rpartition(" ")
+        name = name.split("{", 1)[0]
+        for suffix in suffixes:
+            if name.endswith(suffix):
+                values[suffix] = values.get(suffix, 0) + float(value)
+    return values
+
+
+def node_memory(elysium, i=0):
+    "the current and the peak resident memory of the node process in bytes"
+    pid = elysium.supervisorctl("pid", f"{elysium.base_dir.name}-node{i}").strip()
+    mem = {}
+    for line in (Path("/proc") / pid / "status").read_text().splitlines():
+        key, _, value = line.partition(":")
+        if key in ("VmRSS", "VmHWM"):
+            # in kB
+            mem[key] = int(value.split()[0]) * 1024
+    return {"rss": mem["VmRSS"], "peak_rss": mem["VmHWM"]}
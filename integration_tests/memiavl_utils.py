@@ -0,0 +1,297 @@
+import bisect
+import functools
+import hashlib
+import mmap
+import struct
+from pathlib import Path
+
+# the constants in `memiavl/snapshot.go` and `memiavl/persisted_node.go`,
+# the integers are always encoded in little endian.
+SNAPSHOT_FILE_MAGIC = 1280721225
+SNAPSHOT_FORMAT = 0
+METADATA = struct.Struct("<III")  # magic, format, version
+# height, pre trees, padding, version, size, key leaf, hash
+BRANCH_NODE = struct.Struct("<BB2xIII32s")
+# version, key len, key offset, hash
+LEAF_NODE = struct.Struct("<IIQ32s")
+SIZE_NODE = BRANCH_NODE.size
+SIZE_LEAF = LEAF_NODE.size
+EMPTY_HASH = hashlib.sha256().digest()
+U32 = struct.Struct("<I")
+
+FILE_NAME_NODES = "nodes"
+FILE_NAME_LEAVES = "leaves"
+FILE_NAME_KVS = "kvs"
+FILE_NAME_METADATA = "metadata"
+# file names in the memiavl db directory, see `memiavl/db.go`
+CURRENT_SNAPSHOT = "current"
+
+
+def mmap_file(path):
+    "read-only mmap of the file, empty files are returned as empty bytes"
+    with open(path, "rb") as fp:
+        if fp.seek(0, 2) == 0:
+            return b""
+        return mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+@functools.lru_cache()
+def node_dtypes():
+    """
+    numpy structured dtypes of the branch and leaf nodes,
+    numpy is only needed for the bulk scans.
+    """
+    import numpy as np
+
+    branch = np.dtype(
+        [
+            ("height", "u1"),
+            ("pre_trees", "u1"),
+            ("_padding", "V2"),
+            ("version", "<u4"),
+            ("size", "<u4"),
+            ("key_leaf", "<u4"),
+            ("hash", "V32"),
+        ]
+    )
+    leaf = np.dtype(
+        [
+            ("version", "<u4"),
+            ("key_len", "<u4"),
+            ("key_offset", "<u8"),
+            ("hash", "V32"),
+        ]
+    )
+    assert branch.itemsize == SIZE_NODE and leaf.itemsize == SIZE_LEAF
+    return branch, leaf
+
+
+def encode_varint(n):
+    "zigzag varint, same as go's `binary.PutVarint`"
+    return encode_uvarint((n << 1) ^ (n >> 63))
+
+
+def encode_uvarint(n):
+    out = bytearray()
+    while n >= 0x80:
+        out.append(n & 0x7F | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+def encode_bytes(bz):
+    return encode_uvarint(len(bz)) + bz
+
+
+class Snapshot:
+    """
+    read-only accessor of the snapshot of a single memiavl tree, the files are
+    mmap-ed and the nodes are decoded on demand.
+
+    the leaves are stored in key order, so the key lookups do binary search on the
+    leaves, the optional `kvs.index` hash index is not used.
+    """
+
+    def __init__(self, snapshot_dir):
+        self.dir = Path(snapshot_dir)
+        magic, fmt, self.version = METADATA.unpack(
+            (self.dir / FILE_NAME_METADATA).read_bytes()
+        )
+        assert magic == SNAPSHOT_FILE_MAGIC, f"invalid metadata file magic: {magic}"
+        assert fmt == SNAPSHOT_FORMAT, f"unknown snapshot format: {fmt}"
+        self.nodes = mmap_file(self.dir / FILE_NAME_NODES)
+        self.leaves = mmap_file(self.dir / FILE_NAME_LEAVES)
+        self.kvs = mmap_file(self.dir / FILE_NAME_KVS)
+        assert len(self.nodes) % SIZE_NODE == 0, "corrupted nodes file"
+        assert len(self.leaves) % SIZE_LEAF == 0, "corrupted leaves file"
+        self.nodes_len = len(self.nodes) // SIZE_NODE
+        self.leaves_len = len(self.leaves) // SIZE_LEAF
+        assert (self.leaves_len == 0 and self.nodes_len == 0) or (
+            self.nodes_len + 1 == self.leaves_len
+        ), "branch nodes size don't match leaves size"
+
+    def close(self):
+        for m in (self.nodes, self.leaves, self.kvs):
+            if isinstance(m, mmap.mmap):
+                m.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self.leaves_len
+
+    def branch(self, i):
+        "(height, pre trees, version, size, key leaf, hash) of the branch node"
+        return BRANCH_NODE.unpack_from(self.nodes, i * SIZE_NODE)
+
+    def leaf(self, i):
+        "(version, key len, key offset, hash) of the leaf node"
+        return LEAF_NODE.unpack_from(self.leaves, i * SIZE_LEAF)
+
+    def leaf_key(self, i):
+        _, key_len, offset, _ = self.leaf(i)
+        offset += 4
+        return self.kvs[offset : offset + key_len]
+
+    def leaf_key_value(self, i):
+        _, key_len, offset, _ = self.leaf(i)
+        offset += 4
+        key = self.kvs[offset : offset + key_len]
+        offset += key_len
+        (value_len,) = U32.unpack_from(self.kvs, offset)
+        offset += 4
+        return key, self.kvs[offset : offset + value_len]
+
+    def root_hash(self):
+        "the root node is the last one in the post-order node array"
+        if self.nodes_len > 0:
+            return self.branch(self.nodes_len - 1)[-1]
+        if self.leaves_len > 0:
+            return self.leaf(0)[-1]
+        return EMPTY_HASH
+
+    def _search(self, key):
+        "index of the first leaf whose key is not less than `key`"
+        return bisect.bisect_left(_LeafKeys(self), key)
+
+    def get(self, key):
+        i = self._search(key)
+        if i < self.leaves_len:
+            k, value = self.leaf_key_value(i)
+            if k == key:
+                return value
+        return None
+
+    def iterate(self, start=None, end=None):
+        "yield the key-value pairs in `[start, end)` in key order"
+        i = 0 if start is None else self._search(start)
+        stop = self.leaves_len if end is None else self._search(end)
+        for j in range(i, stop):
+            yield self.leaf_key_value(j)
+
+    def verify(self):
+        "recompute the node hashes in post-order, compare the root hash"
+        if self.leaves_len == 0:
+            return True
+        leaf_hashes = []
+        for i in range(self.leaves_len):
+            version, _, _, stored = self.leaf(i)
+            key, value = self.leaf_key_value(i)
+            h = hashlib.sha256(
+                encode_varint(0)
+                + encode_varint(1)
+                + encode_varint(version)
+                + encode_bytes(key)
+                + encode_bytes(hashlib.sha256(value).digest())
+            ).digest()
+            if h != stored:
+                return False
+            leaf_hashes.append(h)
+
+        branch_hashes = []
+        for i in range(self.nodes_len):
+            height, pre_trees, version, size, key_leaf, stored = self.branch(i)
+            # see `PersistedNode.Left` and `PersistedNode.Right`
+            start_leaf = i + 2 - size + pre_trees
+            if start_leaf + 1 == key_leaf:
+                left = leaf_hashes[start_leaf]
+            else:
+                left = branch_hashes[key_leaf - pre_trees - 2]
+            if key_leaf == i + pre_trees + 1:
+                right = leaf_hashes[key_leaf]
+            else:
+                right = branch_hashes[i - 1]
+            h = hashlib.sha256(
+                encode_varint(height)
+                + encode_varint(size)
+                + encode_varint(version)
+                + encode_bytes(left)
+                + encode_bytes(right)
+            ).digest()
+            if h != stored:
+                return False
+            branch_hashes.append(h)
+        return True
+
+    def branch_array(self):
+        "numpy structured view of the branch nodes, zero-copy"
+        import numpy as np
+
+        return np.frombuffer(self.nodes, dtype=node_dtypes()[0])
+
+    def leaf_array(self):
+        "numpy structured view of the leaf nodes, zero-copy"
+        import numpy as np
+
+        return np.frombuffer(self.leaves, dtype=node_dtypes()[1])
+
+    def key_prefix_counts(self):
+        "count the keys by the first byte of the key"
+        import numpy as np
+
+        leaves = self.leaf_array()
+        leaves = leaves[leaves["key_len"] > 0]
+        kvs = np.frombuffer(self.kvs, dtype="u1")
+        prefixes, counts = np.unique(kvs[leaves["key_offset"] + 4], return_counts=True)
+        return dict(zip(prefixes.tolist(), counts.tolist()))
+
+    def value_sizes(self):
+        "sizes of all the values, in key order"
+        import numpy as np
+
+        leaves = self.leaf_array()
+        kvs = np.frombuffer(self.kvs, dtype="u1")
+        offsets = leaves["key_offset"] + 4 + leaves["key_len"]
+        # gather the 4 bytes little endian value lengths
+        bz = kvs[offsets[:, None] + np.arange(4, dtype="u8")]
+        return np.ascontiguousarray(bz).view("<u4").ravel()
+
+    def value_size_histogram(self):
+        "number of values by the power of two buckets of value size"
+        import numpy as np
+
+        sizes = self.value_sizes().astype("u8")
+        buckets = np.zeros(len(sizes), dtype="u8")
+        nonzero = sizes > 0
+        buckets[nonzero] = np.floor(np.log2(sizes[nonzero])).astype("u8") + 1
+        counts = np.bincount(buckets)
+        # bucket 0 is the empty values, bucket n is `[2^(n-1), 2^n)`
+        return {int(n): int(c) for n, c in enumerate(counts) if c}
+
+
+class _LeafKeys:
+    "lazy sequence of the leaf keys for bisect"
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+
+    def __len__(self):
+        return self.snapshot.leaves_len
+
+    def __getitem__(self, i):
+        return self.snapshot.leaf_key(i)
+
+
+def open_multitree(snapshot_dir):
+    """
+    open the trees in a multi-tree snapshot directory, like the ones written by
+    `changeset verify --save-snapshot`, return `{store name: Snapshot}`.
+    """
+    return {
+        path.name: Snapshot(path)
+        for path in sorted(Path(snapshot_dir).iterdir())
+        if path.is_dir()
+    }
+
+
+def open_memiavl_db(db_dir):
+    """
+    open the trees in the current snapshot of a memiavl db,
+    like `{home}/data/memiavl.db`, return `{store name: Snapshot}`.
+    """
+    return open_multitree(Path(db_dir) / CURRENT_SNAPSHOT)
@@ -1,16 +1,39 @@
+import hashlib
 import json
 import os
+import re
+import shutil
 import signal
 import subprocess
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from pathlib import Path
 
 import tomlkit
 import web3
 from pystarport import ports
+from pystarport.cluster import patch_toml_doc
+from pystarport.expansion import expand_jsonnet, expand_yaml
 from web3.middleware import geth_poa_middleware
 
+from .block_events import close_subscribers, reset_block_subscriber
 from .cosmoscli import CosmosCLI
-from .utils import supervisorctl, wait_for_port
+from .cosmosrest import CosmosREST
+from .rpc_utils import PooledHTTPProvider
+from .utils import (
+    PORT_RANGE_SIZE,
+    allocate_base_port,
+    modify_command_in_supervisor_config,
+    supervisorctl,
+    wait_for_port,
+)
+
+# the location the cached data directory is initialized at
+CACHE_META = "cluster-cache.json"
+# the ports in the urls of the toml configs, and the base ports in config.json
+PORT_PATTERN = re.compile(r"(:\s*)(\d+)\b")
 
 
 class Elysium:
@@ -23,6 +46,8 @@ class Elysium:
         )["app_state"]["elysium"]["params"]["enable_auto_deployment"]
         self._use_websockets = False
         self.chain_binary = chain_binary
+        self._rest_clis = {}
+        self._providers = {}
 
     def copy(self):
         return Elysium(self.base_dir)
@@ -45,7 +70,16 @@ class Elysium:
         if self._use_websockets:
             return web3.Web3(web3.providers.WebsocketProvider(self.w3_ws_endpoint(i)))
         else:
-            return web3.Web3(web3.providers.HTTPProvider(self.w3_http_endpoint(i)))
+            return web3.Web3(self.http_provider(i))
+
+    def http_provider(self, i=0):
+        """
+        the pooled keep-alive provider of the node, shared by the `node_w3`
+        instances, register the timing hooks and do batch calls on it.
+        """
+        if i not in self._providers:
+            self._providers[i] = PooledHTTPProvider(self.w3_http_endpoint(i))
+        return self._providers[i]
 
     def base_port(self, i):
         return self.config["validators"][i]["base_port"]
@@ -53,8 +87,28 @@ class Elysium:
     def node_rpc(self, i):
         return "tcp://127.0.0.1:%d" % ports.rpc_port(self.base_port(i))
 
-    def cosmos_cli(self, i=0) -> CosmosCLI:
-        return CosmosCLI(self.node_home(i), self.node_rpc(i), self.chain_binary)
+    def node_api(self, i=0):
+        return "http://127.0.0.1:%d" % ports.api_port(self.base_port(i))
+
+    def node_rpc_http(self, i=0):
+        return "http://127.0.0.1:%d" % ports.rpc_port(self.base_port(i))
+
+    def cosmos_cli(self, i=0, rest=False) -> CosmosCLI:
+        """
+        rest: do the queries through the REST api and tendermint rpc,
+        the client is cached per node to reuse the keep-alive connections.
+        """
+        if not rest:
+            return CosmosCLI(self.node_home(i), self.node_rpc(i), self.chain_binary)
+        if i not in self._rest_clis:
+            self._rest_clis[i] = CosmosREST(
+                self.node_home(i),
+                self.node_rpc(i),
+                self.chain_binary,
+                self.node_api(i),
+                self.node_rpc_http(i),
+            )
+        return self._rest_clis[i]
 
     def node_home(self, i=0):
         return self.base_dir / f"node{i}"
@@ -66,6 +120,34 @@ class Elysium:
     def supervisorctl(self, *args):
         return supervisorctl(self.base_dir / "../tasks.ini", *args)
 
+    def for_each_node(self, fn, max_workers=4, nodes=None):
+        """
+        run `fn(i)` for the nodes concurrently with at most `max_workers` threads,
+        all the nodes by default, return the results in node order.
+
+        all the nodes are run even if some of them failed, then the failures are
+        raised together.
+        """
+        if nodes is None:
+            nodes = range(len(self.config["validators"]))
+        nodes = list(nodes)
+        with ThreadPoolExecutor(max_workers) as executor:
+            futures = [executor.submit(fn, i) for i in nodes]
+        results = []
+        errors = []
+        for i, fut in zip(nodes, futures):
+            exc = fut.exception()
+            if exc is None:
+                results.append(fut.result())
+            else:
+                errors.append((i, exc))
+        if errors:
+            raise AssertionError(
+                "failed on nodes: "
+                + "; ".join(f"node{i}: {exc!r}" for i, exc in errors)
+            ) from errors[0][1]
+        return results
+
 
 class Chainmain:
     def __init__(self, base_dir):
@@ -86,7 +168,7 @@ class Hermes:
     def __init__(self, config: Path):
         self.configpath = config
         self.config = tomlkit.loads(config.read_text())
-        self.port = 3000
+        self.port = self.config["rest"]["port"]
 
 
 class Geth:
@@ -148,9 +230,99 @@ class GravityBridge:
         self.contract = contract
 
 
-def setup_custom_elysium(
-    path, base_port, config, post_init=None, chain_binary=None, wait_port=True
-):
+def cluster_cache_key(config, chain_binary=None):
+    """
+    the key of the initialized data directory, changes when the expanded config
+    or the chain binaries change, the ports are relocated when reused.
+    """
+    if Path(config).suffix == ".jsonnet":
+        expanded = expand_jsonnet(config, None)
+    else:
+        expanded = expand_yaml(config, None)
+    h = hashlib.sha256()
+    h.update(json.dumps(expanded, sort_keys=True).encode())
+    for chain in expanded.values():
+        binary = shutil.which(chain_binary or chain.get("cmd", "elysiumd"))
+        if binary is None:
+            return None
+        binary = os.path.realpath(binary)
+        st = os.stat(binary)
+        h.update(f"{binary}:{st.st_size}:{st.st_mtime_ns}".encode())
+    return h.hexdigest()
+
+
+def clone_dir(src, dst):
+    "copy-on-write clone when the filesystem supports it, full copy otherwise"
+    try:
+        subprocess.run(
+            ["cp", "-a", "--reflink=auto", f"{src}/.", str(dst)],
+            check=True,
+            stderr=subprocess.DEVNULL,
+        )
+    except subprocess.CalledProcessError:
+        # bsd cp don't support `--reflink`
+        shutil.copytree(src, dst, symlinks=True, dirs_exist_ok=True)
+
+
+def relocate_cluster(path, base_port, size=PORT_RANGE_SIZE):
+    """
+    rewrite the absolute paths and the ports in the configs of a data directory
+    cloned from the cache, to the ones of the new location.
+    """
+    meta = path / CACHE_META
+    origin = json.loads(meta.read_text())
+    meta.unlink()
+    old_port = origin["base_port"]
+
+    def shift(m):
+        port = int(m.group(2))
+        if old_port <= port < old_port + size:
+            port += base_port - old_port
+        return f"{m.group(1)}{port}"
+
+    files = [
+        *path.glob("tasks.ini"),
+        *path.glob("*/tasks.ini"),
+        *path.glob("*/config.json"),
+        *path.glob("*/node*/config/*.toml"),
+    ]
+    for f in files:
+        text = f.read_text().replace(origin["path"], str(path))
+        f.write_text(PORT_PATTERN.sub(shift, text))
+
+
+def refresh_genesis_time(path):
+    "the cached genesis is created in the past, start the chain from now on"
+    for genesis_path in path.glob("*/genesis.json"):
+        genesis = json.loads(genesis_path.read_text())
+        genesis["genesis_time"] = (
+            datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+        )
+        genesis_path.write_text(json.dumps(genesis))
+
+
+def init_cluster_cached(path, base_port, config, chain_binary=None, cache_dir=None):
+    """
+    run `pystarport init`, reuse the data directory initialized by a previous run
+    with the same config and binary to skip the keys and gentxs generation.
+
+    cache_dir: default to the `ELYSIUM_CLUSTER_CACHE` env, or a directory besides
+    the data directory, which is shared by the fixtures of a pytest session.
+    """
+    cache_dir = Path(
+        cache_dir
+        or os.environ.get("ELYSIUM_CLUSTER_CACHE")
+        or Path(path).parent / "cluster-cache"
+    )
+    key = cluster_cache_key(config, chain_binary)
+    cached = cache_dir / key if key is not None else None
+    if cached is not None and cached.exists():
+        print("reuse the initialized data directory", cached)
+        clone_dir(cached, path)
+        relocate_cluster(Path(path), base_port)
+        refresh_genesis_time(path)
+        return
+
     cmd = [
         "pystarport",
         "init",
@@ -166,18 +338,193 @@ def setup_custom_elysium(
         cmd = cmd[:1] + ["--cmd", chain_binary] + cmd[1:]
     print(*cmd)
     subprocess.run(cmd, check=True)
+
+    # the relayer keys are restored outside of the data directory,
+    # don't cache the multi-chain setups.
+    if cached is None or (Path(path) / "relayer.toml").exists():
+        return
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp = cache_dir / f".{key}.{uuid.uuid4().hex}"
+    tmp.mkdir()
+    clone_dir(path, tmp)
+    (tmp / CACHE_META).write_text(
+        json.dumps({"path": str(path), "base_port": base_port})
+    )
+    try:
+        tmp.rename(cached)
+    except OSError:
+        # populated by a concurrent run
+        shutil.rmtree(tmp)
+
+
+def wait_for_evmrpc(base_port):
+    with ThreadPoolExecutor() as executor:
+        list(
+            executor.map(
+                wait_for_port,
+                [ports.evmrpc_port(base_port), ports.evmrpc_ws_port(base_port)],
+            )
+        )
+
+
+def setup_custom_elysium(
+    path, base_port, config, post_init=None, chain_binary=None, wait_port=True
+):
+    """
+    base_port: `None` to allocate a port range not used by the other fixtures.
+    """
+    if base_port is None:
+        base_port = allocate_base_port(path)
+    init_cluster_cached(path, base_port, config, chain_binary)
     if post_init is not None:
         post_init(path, base_port, config)
     proc = subprocess.Popen(
         ["pystarport", "start", "--data", path, "--quiet"],
         preexec_fn=os.setsid,
     )
+    elysium = None
     try:
         if wait_port:
-            wait_for_port(ports.evmrpc_port(base_port))
-            wait_for_port(ports.evmrpc_ws_port(base_port))
-        yield Elysium(path / "elysium_777-1", chain_binary=chain_binary or "elysiumd")
+            wait_for_evmrpc(base_port)
+        elysium = Elysium(
+            path / "elysium_777-1", chain_binary=chain_binary or "elysiumd"
+        )
+        yield elysium
     finally:
+        if elysium is not None:
+            # the subscriptions of the shared clients don't outlive the network
+            close_subscribers(
+                [
+                    elysium.node_rpc_http(i)
+                    for i in range(len(elysium.config["validators"]))
+                ]
+            )
         os.killpg(os.getpgid(proc.pid), signal.SIGTERM)
         # proc.terminate()
         proc.wait()
+
+
+class ClusterPool:
+    """
+    keep the networks alive across the modules of the session, keyed by the base
+    config, the chain binary and the post_init hook, the per module differences of
+    the node configs are applied as start flags or toml overrides when the network
+    is (re)started.
+
+    the data directories are saved before the first start, a reused network is
+    stopped and restored to that state, so it starts from the genesis again without
+    paying for the keys and gentxs generation, the least recently used networks are
+    stopped when there are more than `max_size` ones.
+    """
+
+    def __init__(self, tmp_path_factory, max_size=2):
+        self.tmp_path_factory = tmp_path_factory
+        self.max_size = max_size
+        # key -> (setup generator, elysium, pristine data directory)
+        self.clusters = OrderedDict()
+
+    def acquire(
+        self, config, post_init=None, chain_binary=None, flags=None, overrides=None
+    ):
+        """
+        return a network started from the genesis,
+        post_init: a module level function, it's part of the key.
+        flags: extra command line flags to start the nodes with.
+        overrides: `{"config": {...}, "app-config": {...}}`, patched into the
+          `config.toml` and `app.toml` of the nodes.
+        """
+        key = cluster_cache_key(config, chain_binary)
+        if key is not None and post_init is not None:
+            key += f":{post_init_key(post_init)}"
+        if key in self.clusters:
+            self.clusters.move_to_end(key)
+            _, elysium, pristine = self.clusters[key]
+            print("reuse network", elysium.base_dir)
+            restore_cluster(elysium, pristine, flags, overrides)
+            return elysium
+
+        while self.clusters and len(self.clusters) >= self.max_size:
+            _, (gen, _, _) = self.clusters.popitem(last=False)
+            gen.close()
+
+        path = self.tmp_path_factory.mktemp("pool")
+        pristine = self.tmp_path_factory.mktemp("pool-pristine")
+
+        def save_pristine(path, base_port, config):
+            if post_init is not None:
+                post_init(path, base_port, config)
+            clone_dir(path, pristine)
+            if flags:
+                set_start_flags(path, flags)
+            if overrides:
+                override_node_configs(path, overrides)
+
+        gen = setup_custom_elysium(
+            path, None, config, post_init=save_pristine, chain_binary=chain_binary
+        )
+        elysium = next(gen)
+        if key is None:
+            # can't identify the chain binary, don't reuse it
+            key = str(path)
+        self.clusters[key] = (gen, elysium, pristine)
+        return elysium
+
+    def close(self):
+        while self.clusters:
+            _, (gen, _, _) = self.clusters.popitem()
+            gen.close()
+
+
+def post_init_key(post_init):
+    "the stable identity of the hook, the closures can't be told apart by name"
+    assert (
+        "<locals>" not in post_init.__qualname__
+    ), f"post_init must be a module level function: {post_init.__qualname__}"
+    return f"{post_init.__module__}.{post_init.__qualname__}"
+
+
+def override_node_configs(path, overrides):
+    "patch the `config.toml` and `app.toml` of all the nodes"
+    files = {"config": "config.toml", "app-config": "app.toml"}
+    for name, patch in overrides.items():
+        for toml in Path(path).glob(f"*/node*/config/{files[name]}"):
+            doc = tomlkit.parse(toml.read_text())
+            patch_toml_doc(doc, patch)
+            toml.write_text(tomlkit.dumps(doc))
+
+
+def set_start_flags(path, flags):
+    for ini in Path(path).glob("*/tasks.ini"):
+        modify_command_in_supervisor_config(ini, lambda cmd: f"{cmd} {flags}")
+
+
+def restore_cluster(elysium, pristine, flags=None, overrides=None):
+    """
+    stop the nodes, restore the node homes, genesis and the supervisor config from
+    the pristine data directory, then start the nodes again.
+    """
+    print(elysium.supervisorctl("stop", "all"))
+    # the restored chain is behind the blocks seen on the same ports
+    for i in range(len(elysium.config["validators"])):
+        reset_block_subscriber(elysium.node_rpc_http(i))
+    chain_dir = elysium.base_dir
+    src = Path(pristine) / chain_dir.name
+    nodes = [p for p in src.glob("node*") if p.is_dir()]
+    for node_home in nodes:
+        shutil.rmtree(chain_dir / node_home.name)
+        clone_dir(node_home, chain_dir / node_home.name)
+    for name in ("genesis.json", "tasks.ini"):
+        shutil.copyfile(src / name, chain_dir / name)
+    if flags:
+        set_start_flags(chain_dir.parent, flags)
+    if overrides:
+        override_node_configs(chain_dir.parent, overrides)
+    refresh_genesis_time(chain_dir.parent)
+    # pick up the changes of the commands
+    print(elysium.supervisorctl("update"))
+    print(
+        elysium.supervisorctl(
+            "start", *[f"{chain_dir.name}-{node.name}" for node in nodes]
+        )
+    )
+    wait_for_evmrpc(elysium.base_port(0))
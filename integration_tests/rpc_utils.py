@@ -0,0 +1,115 @@
+import itertools
+import json
+import time
+from collections import defaultdict
+
+import requests
+from requests.adapters import HTTPAdapter
+from web3._utils.encoding import Web3JsonEncoder
+from web3.providers import HTTPProvider
+
+
+class PooledHTTPProvider(HTTPProvider):
+    """
+    `HTTPProvider` over its own keep-alive session with a sized connection pool,
+    instead of the process wide session cache of web3.
+
+    the hooks are called after each http request with
+    `(method, params, elapsed, response)`, the method of a batch request is
+    `"batch"` and the params are the list of `(method, params)`.
+    """
+
+    def __init__(self, endpoint_uri, pool_size=20, request_kwargs=None, hooks=()):
+        super().__init__(endpoint_uri, request_kwargs=request_kwargs)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.hooks = list(hooks)
+        self._ids = itertools.count(1)
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+        return hook
+
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+
+    def close(self):
+        self.session.close()
+
+    def post(self, data):
+        kwargs = self.get_request_kwargs()
+        # same default as `web3._utils.request.make_post_request`
+        kwargs.setdefault("timeout", 10)
+        rsp = self.session.post(self.endpoint_uri, data=data, **kwargs)
+        rsp.raise_for_status()
+        return rsp.content
+
+    def make_request(self, method, params):
+        begin = time.monotonic()
+        rsp = self.decode_rpc_response(
+            self.post(self.encode_rpc_request(method, params))
+        )
+        elapsed = time.monotonic() - begin
+        for hook in self.hooks:
+            hook(method, params, elapsed, rsp)
+        return rsp
+
+    def batch(self, calls):
+        """
+        send the `(method, params)` calls in a single json-rpc array request,
+        return the raw responses in the same order.
+        """
+        calls = list(calls)
+        if not calls:
+            return []
+        ids = [next(self._ids) for _ in calls]
+        begin = time.monotonic()
+        data = json.dumps(
+            [
+                {"jsonrpc": "2.0", "id": rpcid, "method": method, "params": params}
+                for rpcid, (method, params) in zip(ids, calls)
+            ],
+            cls=Web3JsonEncoder,
+        )
+        by_id = {item["id"]: item for item in json.loads(self.post(data))}
+        rsps = [by_id[rpcid] for rpcid in ids]
+        elapsed = time.monotonic() - begin
+        for hook in self.hooks:
+            hook("batch", calls, elapsed, rsps)
+        return rsps
+
+
+class RequestStats:
+    "a provider hook that collects the count and the total time per method"
+
+    def __init__(self):
+        self.count = defaultdict(int)
+        self.elapsed = defaultdict(float)
+
+    def __call__(self, method, params, elapsed, rsp):
+        self.count[method] += 1
+        self.elapsed[method] += elapsed
+
+    def report(self):
+        return {
+            method: {
+                "count": count,
+                "total": self.elapsed[method],
+                "avg": self.elapsed[method] / count,
+            }
+            for method, count in self.count.items()
+        }
+
+
+def batch_call(w3, calls):
+    """
+    coalesce the `(method, params)` calls into one json-rpc batch request,
+    return the raw results in the same order, the results are not formatted by
+    web3, e.g. the integers are still hex strings.
+    """
+    rsps = w3.provider.batch(calls)
+    for rsp in rsps:
+        assert "error" not in rsp, rsp["error"]
+    return [rsp["result"] for rsp in rsps]
@@ -0,0 +1,92 @@
+import mmap
+import re
+from pathlib import Path
+
+from cprotobuf import Field, ProtoEntity
+
+# tag of the `store_key` field of `StoreKVPairs`, field 1 with length-delimited type
+STORE_KEY_TAG = 0x0A
+BLOCK_DATA_FILE = re.compile(r"^block-(\d+)-data$")
+
+
+class StoreKVPairs(ProtoEntity):
+    # the store key for the KVStore this pair originates from
+    store_key = Field("string", 1)
+    # true indicates a delete operation
+    delete = Field("bool", 2)
+    key = Field("bytes", 3)
+    value = Field("bytes", 4)
+
+
+def decode_varint(buf, offset):
+    "return the decoded uint64 and the offset after it"
+    result = 0
+    shift = 0
+    while True:
+        b = buf[offset]
+        offset += 1
+        result |= (b & 0x7F) << shift
+        if b < 0x80:
+            return result, offset
+        shift += 7
+
+
+def peek_store_key(buf):
+    """
+    read the `store_key` of an encoded `StoreKVPairs` without parsing the whole
+    message, the go encoder always write the fields in order.
+    """
+    if not len(buf) or buf[0] != STORE_KEY_TAG:
+        # empty string is omitted
+        return b""
+    size, offset = decode_varint(buf, 1)
+    return buf[offset : offset + size]
+
+
+def iter_stream_entries(buf, entry_cls=StoreKVPairs, store_key=None):
+    """
+    lazily decode the entries of a block data file:
+    total size(uint64 big endian), size(varint), entry, size(varint), entry, ...
+
+    store_key: only parse the entries of this store.
+    """
+    buf = memoryview(buf)
+    assert int.from_bytes(buf[:8], "big") + 8 == len(buf), "incomplete file"
+    wanted = store_key.encode() if store_key is not None else None
+    offset = 8
+    while offset < len(buf):
+        size, offset = decode_varint(buf, offset)
+        chunk = buf[offset : offset + size]
+        offset += size
+        if wanted is not None and peek_store_key(chunk) != wanted:
+            continue
+        item = entry_cls()
+        item.ParseFromString(bytes(chunk))
+        yield item
+
+
+def iter_stream_file(path, entry_cls=StoreKVPairs, store_key=None):
+    "mmap the block data file and decode the entries lazily"
+    with open(path, "rb") as fp:
+        if fp.seek(0, 2) == 0:
+            raise AssertionError(f"empty stream file: {path}")
+        with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            with memoryview(m) as buf:
+                yield from iter_stream_entries(buf, entry_cls, store_key)
+
+
+def stream_data_files(directory):
+    "return the (block height, path) of the block data files in block order"
+    files = []
+    for path in Path(directory).iterdir():
+        m = BLOCK_DATA_FILE.match(path.name)
+        if m:
+            files.append((int(m.group(1)), path))
+    return sorted(files)
+
+
+def iter_stream_dir(directory, entry_cls=StoreKVPairs, store_key=None):
+    "decode the state changes of the whole file_streamer directory in block order"
+    for height, path in stream_data_files(directory):
+        for item in iter_stream_file(path, entry_cls, store_key):
+            yield height, item
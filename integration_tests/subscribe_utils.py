@@ -0,0 +1,239 @@
+import asyncio
+import itertools
+import json
+import time
+
+import websockets
+
+# what to do when the queue of a subscription is full
+POLICY_BLOCK = "block"  # stop reading the connection until the consumer catch up
+POLICY_DROP = "drop"  # drop the new notifications
+
+
+class Subscription:
+    """
+    the notifications of a `eth_subscribe` subscription, buffered in a bounded
+    queue, with the stats of the delivery.
+    """
+
+    def __init__(self, conn, params, maxsize, policy):
+        assert policy in (POLICY_BLOCK, POLICY_DROP), f"unknown policy: {policy}"
+        self.conn = conn
+        self.params = params
+        self.policy = policy
+        self.id = None
+        # (receive time, result)
+        self.queue = asyncio.Queue(maxsize)
+        self.received = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.decode_time = 0
+        self.consumed = 0
+        self.total_lag = 0
+        self.max_lag = 0
+        # the error which closed the connection
+        self.error = None
+
+    async def put(self, received_at, result):
+        self.received += 1
+        if self.policy == POLICY_DROP:
+            try:
+                self.queue.put_nowait((received_at, result))
+            except asyncio.QueueFull:
+                self.dropped += 1
+                return
+        else:
+            await self.queue.put((received_at, result))
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+
+    def fail(self, error):
+        "wake up the consumers, the queued notifications are still delivered"
+        self.error = error
+        try:
+            self.queue.put_nowait(None)
+        except asyncio.QueueFull:
+            # the consumer raises after draining the queue
+            pass
+
+    async def recv(self):
+        if self.error is not None and self.queue.empty():
+            raise self.error
+        item = await self.queue.get()
+        if item is None:
+            # keep the sentinel for the other consumers
+            self.queue.put_nowait(None)
+            raise self.error
+        received_at, result = item
+        lag = time.monotonic() - received_at
+        self.consumed += 1
+        self.total_lag += lag
+        self.max_lag = max(self.max_lag, lag)
+        return result
+
+    def qsize(self):
+        return self.queue.qsize()
+
+    def stats(self):
+        return {
+            "id": self.id,
+            "params": self.params,
+            "received": self.received,
+            "dropped": self.dropped,
+            "depth": self.qsize(),
+            "max_depth": self.max_depth,
+            "decode_time": self.decode_time,
+            "avg_lag": self.total_lag / self.consumed if self.consumed else None,
+            "max_lag": self.max_lag,
+        }
+
+
+class Connection:
+    "a websocket connection multiplexing the responses and subscriptions"
+
+    def __init__(self, ws, ids):
+        self._ws = ws
+        self._ids = ids
+        self._rsps = {}
+        # pending `eth_subscribe` requests, rpc id -> subscription
+        self._pending = {}
+        self.subs = {}
+        # notifications of unknown subscriptions, e.g. after unsubscribe
+        self.stray = 0
+        self.error = None
+        self._task = asyncio.create_task(self.receive_loop())
+
+    async def receive_loop(self):
+        try:
+            await self._receive()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.fail(e)
+
+    def fail(self, error):
+        "fail the pending requests and the subscriptions of the closed connection"
+        self.error = error
+        for fut in self._rsps.values():
+            if not fut.done():
+                fut.set_exception(error)
+        self._rsps.clear()
+        self._pending.clear()
+        for sub in self.subs.values():
+            sub.fail(error)
+
+    async def _receive(self):
+        while True:
+            frame = await self._ws.recv()
+            received_at = time.monotonic()
+            msg = json.loads(frame)
+            decode_time = time.monotonic() - received_at
+            if "id" in msg:
+                # responses
+                sub = self._pending.pop(msg["id"], None)
+                if sub is not None and "result" in msg:
+                    # register before processing the following notifications
+                    sub.id = msg["result"]
+                    self.subs[sub.id] = sub
+                fut = self._rsps.pop(msg["id"], None)
+                if fut is not None and not fut.done():
+                    fut.set_result(msg)
+                continue
+            # subscriptions
+            assert msg["method"] == "eth_subscription"
+            sub = self.subs.get(msg["params"]["subscription"])
+            if sub is None:
+                self.stray += 1
+                continue
+            sub.decode_time += decode_time
+            await sub.put(received_at, msg["params"]["result"])
+
+    async def request(self, method, params, sub=None):
+        if self.error is not None:
+            raise self.error
+        rpcid = next(self._ids)
+        fut = asyncio.get_running_loop().create_future()
+        self._rsps[rpcid] = fut
+        if sub is not None:
+            self._pending[rpcid] = sub
+        await self._ws.send(
+            json.dumps({"id": rpcid, "method": method, "params": params})
+        )
+        rsp = await fut
+        assert "error" not in rsp, rsp["error"]
+        return rsp["result"]
+
+    async def close(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        await self._ws.close()
+
+
+class SubscriptionClient:
+    """
+    `eth_subscribe` client over a pool of websocket connections,
+    the subscriptions are distributed to the connections in round robin.
+
+    with the block policy, a full queue stops the whole connection, including the
+    responses, so don't wait for a response while not consuming the notifications.
+    when a connection is closed, its pending requests and subscriptions raise the
+    error, after the queued notifications are consumed.
+
+    ```
+    async with SubscriptionClient(url, connections=4) as c:
+        sub = await c.subscribe("newHeads")
+        head = await sub.recv()
+        await c.unsubscribe(sub)
+    ```
+    """
+
+    def __init__(self, url, connections=1, maxsize=10000, policy=POLICY_BLOCK):
+        self.url = url
+        self.size = connections
+        self.maxsize = maxsize
+        self.policy = policy
+        self.conns = []
+        self.subscriptions = []
+        self._ids = itertools.count(1)
+        self._next_conn = itertools.cycle(range(connections))
+
+    async def connect(self):
+        for _ in range(self.size):
+            # the notifications of logs could be large
+            ws = await websockets.connect(self.url, max_size=None)
+            self.conns.append(Connection(ws, self._ids))
+        return self
+
+    async def close(self):
+        await asyncio.gather(*[conn.close() for conn in self.conns])
+        self.conns = []
+
+    async def __aenter__(self):
+        return await self.connect()
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def subscribe(self, *params, maxsize=None, policy=None):
+        conn = self.conns[next(self._next_conn)]
+        sub = Subscription(
+            conn,
+            params,
+            self.maxsize if maxsize is None else maxsize,
+            policy or self.policy,
+        )
+        await conn.request("eth_subscribe", params, sub=sub)
+        self.subscriptions.append(sub)
+        return sub
+
+    async def unsubscribe(self, sub):
+        "return False if the subscription don't exist on the node"
+        ok = await sub.conn.request("eth_unsubscribe", [sub.id])
+        sub.conn.subs.pop(sub.id, None)
+        return ok
+
+    def stats(self):
+        "the delivery stats of all the subscriptions"
+        return [sub.stats() for sub in self.subscriptions]
@@ -10,6 +10,8 @@ from eth_utils import abi, big_endian_to_int
 from hexbytes import HexBytes
 from pystarport import cluster, ports
 
+from .batch_utils import build_batch_tx_raw
+from .rpc_utils import batch_call
 from .utils import (
     ADDRS,
     CONTRACTS,
@@ -22,11 +24,17 @@ from .utils import (
     contract_path,
     deploy_contract,
     get_receipts_by_block,
+    iter_block_receipts,
     modify_command_in_supervisor_config,
+    parse_events,
     send_transaction,
+    send_transactions,
     send_txs,
+    w3_wait_for_new_blocks,
     wait_for_block,
+    wait_for_block_receipts,
     wait_for_port,
+    wait_for_receipts,
 )
 
 
@@ -576,6 +584,49 @@ def test_batch_tx(elysium):
         assert txs[i].transactionIndex == i
 
 
+def test_batch_call(elysium):
+    "coalesce the json-rpc calls in a single batch request"
+    w3 = elysium.w3
+    block = w3.eth.get_block("latest")
+    calls = [("eth_getBalance", [addr, hex(block.number)]) for addr in ADDRS.values()]
+    calls.append(("eth_getBlockByNumber", [hex(block.number), False]))
+    results = batch_call(w3, calls)
+    assert len(results) == len(calls)
+    for addr, balance in zip(ADDRS.values(), results):
+        assert int(balance, 16) == w3.eth.get_balance(addr, block.number)
+    assert HexBytes(results[-1]["hash"]) == block.hash
+
+
+def test_batch_tx_native(elysium):
+    "encode the batch tx in python and broadcast through the REST api"
+    w3 = elysium.w3
+    cli = elysium.cosmos_cli(rest=True)
+    sender = ADDRS["signer2"]
+    recipient = ADDRS["community"]
+    nonce = w3.eth.get_transaction_count(sender)
+    balance = w3.eth.get_balance(recipient)
+    n = 100
+    txs = [
+        {
+            "to": recipient,
+            "value": 1000,
+            "nonce": nonce + i,
+            "gas": 21000,
+            "gasPrice": w3.eth.gas_price,
+        }
+        for i in range(n)
+    ]
+    tx_bytes, tx_hashes = build_batch_tx_raw(w3, txs, KEYS["signer2"])
+    rsp = cli.broadcast_tx_bytes(tx_bytes)
+    assert rsp["code"] == 0, rsp["raw_log"]
+
+    receipts = wait_for_receipts(w3, tx_hashes)
+    assert all(receipt.status == 1 for receipt in receipts)
+    assert len({receipt.blockNumber for receipt in receipts}) == 1
+    assert [receipt.transactionIndex for receipt in receipts] == list(range(n))
+    assert w3.eth.get_balance(recipient) == balance + 1000 * n
+
+
 def test_failed_transfer_tx(elysium):
     """
     It's possible to include a failed transfer transaction in batch tx
@@ -618,6 +669,10 @@ def test_failed_transfer_tx(elysium):
     assert len(receipts) == len(rsp["result"])
     for a, b in zip(receipts, rsp["result"]):
         assert a == b
+    # the batched version, one block per batch
+    blk = receipts[0].blockNumber
+    batched = list(iter_block_receipts(w3, blk - 1, blk, batch_size=1))
+    assert [r for r in batched if r.blockNumber == blk] == receipts
 
     # check traceTransaction
     rsps = [
@@ -631,6 +686,30 @@ def test_failed_transfer_tx(elysium):
         assert receipt.gasUsed == rsp["gas"]
 
 
+def test_block_receipts_empty_block(elysium):
+    "the blocks without eth txs don't break the batched receipts scan"
+    w3 = elysium.w3
+    w3_wait_for_new_blocks(w3, 2)
+    latest = w3.eth.block_number
+    empty = next(
+        n for n in range(latest, 0, -1) if not w3.eth.get_block(n).transactions
+    )
+    rsp = w3.provider.make_request(
+        "elysium_getTransactionReceiptsByBlock", [hex(empty)]
+    )
+    assert rsp["result"] is None
+    assert list(iter_block_receipts(w3, empty, empty)) == []
+
+    start = max(empty - 5, 1)
+    receipts = list(iter_block_receipts(w3, start, latest, batch_size=2))
+    txs = [
+        txhash
+        for n in range(start, latest + 1)
+        for txhash in w3.eth.get_block(n).transactions
+    ]
+    assert [receipt.transactionHash for receipt in receipts] == txs
+
+
 def test_log0(cluster):
     """
     test compliance of empty topics behavior
@@ -699,9 +778,12 @@ def test_tx_inclusion(elysium, max_gas_wanted):
     print("max_tx_in_block", max_tx_in_block)
     to = ADDRS["validator"]
     params = {"gas": tx_gas_limit}
-    _, sended_hash_set = send_txs(w3, cli, to, list(KEYS.values())[0:4], params)
+    block_num_0, sended_hash_set = send_txs(
+        w3, cli, to, list(KEYS.values())[0:4], params
+    )
     block_nums = [
-        w3.eth.wait_for_transaction_receipt(h).blockNumber for h in sended_hash_set
+        receipt.blockNumber
+        for receipt in wait_for_block_receipts(w3, sended_hash_set, block_num_0)
     ]
     block_nums.sort()
     print(f"all block numbers: {block_nums}")
@@ -767,3 +849,60 @@ def test_submit_any_proposal(elysium, tmp_path):
     grant_detail = cli.query_grant(granter_addr, grantee_addr)
     assert grant_detail["granter"] == granter_addr
     assert grant_detail["grantee"] == grantee_addr
+
+
+def test_rest_query_client(elysium):
+    "the REST backed client returns the same results as the cli"
+    cli = elysium.cosmos_cli()
+    rest = elysium.cosmos_cli(rest=True)
+    assert rest is elysium.cosmos_cli(rest=True), "client should be cached"
+    addr = cli.address("community")
+    assert rest.balances(addr) == cli.balances(addr)
+    assert rest.account(addr) == cli.account(addr)
+    val_addr = cli.address("validator", bech="val")
+    assert rest.validator(val_addr) == cli.validator(val_addr)
+    assert rest.staking_pool() == cli.staking_pool()
+    assert rest.query_params() == cli.query_params()
+    assert rest.status()["NodeInfo"]["network"] == cli.chain_id
+    with pytest.raises(AssertionError):
+        rest.query_contract_by_denom(
+            "gravity0x0000000000000000000000000000000000000001"
+        )
+
+
+def test_send_transactions(elysium):
+    "pipelined sending with locally tracked nonces"
+    w3 = elysium.w3
+    sender = ADDRS["signer1"]
+    recipient = ADDRS["signer2"]
+    nonce = w3.eth.get_transaction_count(sender)
+    balance = w3.eth.get_balance(recipient)
+    n = 10
+    receipts = send_transactions(
+        w3,
+        [{"to": recipient, "value": 1000, "gas": 21000} for i in range(n)],
+        KEYS["signer1"],
+    )
+    assert all(receipt.status == 1 for receipt in receipts)
+    txs = [w3.eth.get_transaction(receipt.transactionHash) for receipt in receipts]
+    assert [tx.nonce for tx in txs] == list(range(nonce, nonce + n))
+    assert w3.eth.get_balance(recipient) == balance + 1000 * n
+
+
+def test_submit_cosmos_txs(elysium):
+    "broadcast cosmos txs of different signers concurrently and wait the futures"
+    cli = elysium.cosmos_cli()
+    recipient = cli.address("signer2")
+    balance = cli.balance(recipient)
+    signers = ["validator", "community", "signer1"]
+    futs = [cli.submit("transfer", name, recipient, "1000basetely") for name in signers]
+    rsps = [fut.result(timeout=60) for fut in futs]
+    assert all(rsp["code"] == 0 for rsp in rsps), [rsp["raw_log"] for rsp in rsps]
+    assert all(rsp["height"] > 0 for rsp in rsps)
+    # the logs are the same as the block broadcast mode
+    for name, rsp in zip(signers, rsps):
+        ev = parse_events(rsp["logs"])["transfer"]
+        assert ev["sender"] == cli.address(name)
+        assert ev["recipient"] == recipient
+        assert ev["amount"] == "1000basetely"
+    assert cli.balance(recipient) == balance + 1000 * len(signers)
@@ -0,0 +1,74 @@
+import json
+import os
+import time
+from pathlib import Path
+
+import pytest
+from pystarport import ports
+
+from .genesis_utils import large_genesis_post_init
+from .loadgen import node_memory
+from .network import setup_custom_elysium
+from .utils import wait_for_block, wait_for_port
+
+pytestmark = pytest.mark.benchmark
+
+# the size of the synthetic state, override with the env vars to test millions
+STATE = {
+    "accounts": int(os.getenv("ELYSIUM_GENESIS_ACCOUNTS", 100000)),
+    "contracts": int(os.getenv("ELYSIUM_GENESIS_CONTRACTS", 1000)),
+    "slots": int(os.getenv("ELYSIUM_GENESIS_SLOTS", 100)),
+    "token_mappings": int(os.getenv("ELYSIUM_GENESIS_TOKEN_MAPPINGS", 1000)),
+}
+# the InitChain of a large genesis takes longer than the default port timeout
+START_TIMEOUT = 1800
+
+
+def test_large_genesis(tmp_path_factory):
+    """
+    start a chain from a genesis with a large synthetic state,
+    measure the genesis generation, the InitChain, the memory and the export.
+    """
+    chain_id = "elysium_777-1"
+    report = {"state": STATE}
+    generate = large_genesis_post_init(chain_id, **STATE)
+    times = {}
+
+    def post_init(path, base_port, config):
+        begin = time.monotonic()
+        generate(path, base_port, config)
+        report["generate_time"] = time.monotonic() - begin
+        report["genesis_size"] = (path / chain_id / "genesis.json").stat().st_size
+        # the nodes are started right after the post_init
+        times["start"] = time.monotonic()
+
+    gen = setup_custom_elysium(
+        tmp_path_factory.mktemp("large_genesis"),
+        None,
+        Path(__file__).parent / "configs/default.jsonnet",
+        post_init=post_init,
+        wait_port=False,
+    )
+    elysium = next(gen)
+    try:
+        # the rpc server is started after the InitChain in the handshake
+        wait_for_port(ports.rpc_port(elysium.base_port(0)), timeout=START_TIMEOUT)
+        report["init_chain_time"] = time.monotonic() - times["start"]
+        cli = elysium.cosmos_cli()
+        wait_for_block(cli, 1, timeout=START_TIMEOUT)
+        report["first_block_time"] = time.monotonic() - times["start"]
+        report["memory"] = node_memory(elysium)
+
+        # the db is locked by the running node
+        elysium.supervisorctl("stop", f"{chain_id}-node0")
+        begin = time.monotonic()
+        exported = cli.export()
+        report["export_time"] = time.monotonic() - begin
+        report["export_size"] = len(exported)
+        print("genesis report", json.dumps(report, indent=2), sep="\n")
+
+        app_state = json.loads(exported)["app_state"]
+        assert len(app_state["bank"]["balances"]) >= STATE["accounts"]
+        assert len(app_state["evm"]["accounts"]) >= STATE["contracts"]
+    finally:
+        gen.close()
@@ -0,0 +1,78 @@
+import json
+
+import pytest
+from pystarport import ports
+
+from .loadgen import fund_accounts, run_load
+from .utils import (
+    ADDRS,
+    CONTRACTS,
+    deploy_contract,
+    modify_command_in_supervisor_config,
+    wait_for_port,
+)
+
+pytestmark = pytest.mark.benchmark
+
+# the current command -> the original command of each node
+origin_cmds = {}
+
+
+def set_max_tx_gas_wanted(elysium, max_gas_wanted):
+    "restart the nodes with a different `--evm.max-tx-gas-wanted`"
+
+    def fn(cmd):
+        origin = origin_cmds.pop(cmd, cmd)
+        cmd = f"{origin} --evm.max-tx-gas-wanted {max_gas_wanted}"
+        origin_cmds[cmd] = origin
+        return cmd
+
+    restart_with(elysium, fn)
+
+
+def restart_with(elysium, fn):
+    modify_command_in_supervisor_config(elysium.base_dir / "tasks.ini", fn)
+    elysium.supervisorctl("update")
+    wait_for_port(ports.evmrpc_port(elysium.base_port(0)))
+    wait_for_port(ports.evmrpc_ws_port(elysium.base_port(0)))
+
+
+@pytest.fixture(scope="module", autouse=True)
+def restore_cmd(elysium):
+    "the network is shared by the session, restore the original commands after"
+    yield
+    if origin_cmds:
+        restart_with(elysium, lambda cmd: origin_cmds.pop(cmd, cmd))
+
+
+@pytest.fixture(scope="module")
+def senders(elysium):
+    return fund_accounts(elysium.w3, 50, 10**21)
+
+
+@pytest.mark.parametrize("max_gas_wanted", [80000000, 500000])
+@pytest.mark.parametrize("kind", ["transfer", "message_call"])
+def test_load(elysium, senders, kind, max_gas_wanted):
+    """
+    sustain a target tps across many senders,
+    report the inclusion latency and block gas fill.
+    """
+    set_max_tx_gas_wanted(elysium, max_gas_wanted)
+    w3 = elysium.w3
+    if kind == "transfer":
+        tps, total = 100, 1000
+
+        def build_tx(i):
+            return {"to": ADDRS["community"], "value": 1, "gas": 21000}
+
+    else:
+        tps, total = 20, 200
+        contract = deploy_contract(w3, CONTRACTS["TestMessageCall"])
+        data = contract.encodeABI(fn_name="test", args=[100])
+
+        def build_tx(i):
+            return {"to": contract.address, "data": data, "gas": 2000000}
+
+    report = run_load(elysium, senders, tps, total, build_tx)
+    print("load report", kind, max_gas_wanted, json.dumps(report, indent=2), sep="\n")
+    assert report["included"] == report["submitted"]
@@ -0,0 +1,110 @@
+import asyncio
+import json
+import os
+from pathlib import Path
+
+import pytest
+from eth_account import Account
+from eth_utils import keccak
+from hexbytes import HexBytes
+
+from .loadgen import bench_rpc, find_regressions, load_baseline, save_baseline
+from .utils import ADDRS, CONTRACTS, deploy_contract, send_transactions
+
+pytestmark = pytest.mark.benchmark
+
+ROUNDS = 10
+# `TestMessageCall.test` iterations per round, each iteration emits one event
+ITERATIONS = 200
+RECIPIENTS = 10
+# the ranges ending at the last block of the corpus, stay under `block-range-cap`
+RANGE_SIZES = [1, 10, 100, 1000]
+REPEAT = 10
+TRANSFER_TOPIC = keccak(text="Transfer(address,address,uint256)")
+
+
+def baseline_path(request):
+    "override with `ELYSIUM_BENCHMARK_BASELINE` to keep the baseline out of the cache"
+    path = os.getenv("ELYSIUM_BENCHMARK_BASELINE")
+    if path:
+        return Path(path) / "getlogs.json"
+    return request.config.cache.mkdir("benchmark") / "getlogs.json"
+
+
+@pytest.fixture(scope="module")
+def corpus(elysium):
+    """
+    emit `ROUNDS * ITERATIONS` events from the inner contract of `TestMessageCall`,
+    and erc20 transfers to a few recipients, spread in multiple blocks.
+    """
+    w3 = elysium.w3
+    message_call = deploy_contract(w3, CONTRACTS["TestMessageCall"])
+    erc20 = deploy_contract(w3, CONTRACTS["TestERC20A"])
+    recipients = [Account.create().address for _ in range(RECIPIENTS)]
+    data = message_call.encodeABI(fn_name="test", args=[ITERATIONS])
+    first = last = None
+    for i in range(ROUNDS):
+        txs = [{"to": message_call.address, "data": data, "gas": 10000000}] + [
+            erc20.functions.transfer(recipient, i + 1).build_transaction(
+                {"from": ADDRS["validator"], "gas": 100000}
+            )
+            for recipient in recipients
+        ]
+        receipts = send_transactions(w3, txs)
+        assert all(receipt.status == 1 for receipt in receipts)
+        first = first or min(receipt.blockNumber for receipt in receipts)
+        last = max(receipt.blockNumber for receipt in receipts)
+    return {
+        "first": first,
+        "last": last,
+        "inner": message_call.functions.inner().call(),
+        "erc20": erc20.address,
+        "recipient": recipients[0],
+    }
+
+
+def log_filters(corpus):
+    "name -> filter, from the least selective to the most selective"
+    return {
+        "all": {},
+        "topic": {"topics": [HexBytes(TRANSFER_TOPIC).hex()]},
+        "address": {"address": corpus["inner"]},
+        "address_topics": {
+            "address": corpus["erc20"],
+            "topics": [
+                HexBytes(TRANSFER_TOPIC).hex(),
+                None,
+                HexBytes(HexBytes(corpus["recipient"]).rjust(32, b"\0")).hex(),
+            ],
+        },
+    }
+
+
+def test_get_logs(elysium, corpus, request):
+    """
+    sweep the block range size and the filter selectivity of `eth_getLogs`,
+    compare the latencies with the baseline of the previous run.
+    """
+    w3 = elysium.w3
+    results = {}
+    for name, flt in log_filters(corpus).items():
+        for size in RANGE_SIZES:
+            query = dict(
+                flt,
+                fromBlock=hex(max(corpus["last"] - size + 1, 1)),
+                toBlock=hex(corpus["last"]),
+            )
+            nlogs = len(w3.eth.get_logs(query))
+            payloads = [
+                {"jsonrpc": "2.0", "id": i, "method": "eth_getLogs", "params": [query]}
+                for i in range(REPEAT)
+            ]
+            stats = asyncio.run(bench_rpc(elysium.w3_http_endpoint(), payloads, 1))
+            assert stats["errors"] == 0
+            results[f"{name}-{size}"] = dict(stats, logs=nlogs)
+
+    path = baseline_path(request)
+    regressions = find_regressions(results, load_baseline(path))
+    print("getLogs report", json.dumps(results, indent=2), sep="\n")
+    assert not regressions, f"eth_getLogs regressions: {regressions}"
+    save_baseline(path, results)
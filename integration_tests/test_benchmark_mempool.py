@@ -0,0 +1,273 @@
+import asyncio
+import functools
+import json
+import os
+import random
+import threading
+import time
+from pathlib import Path
+
+import aiohttp
+import pytest
+import requests
+import tomlkit
+from eth_account import Account
+from hexbytes import HexBytes
+
+from .account_utils import derive_accounts
+from .genesis_utils import add_genesis_accounts
+from .loadgen import percentile, prometheus_metrics
+from .utils import ADDRS, iter_block_receipts, w3_wait_for_new_blocks
+
+pytestmark = pytest.mark.benchmark
+
+# smaller than the flood, so the mempool need to evict
+MEMPOOL_SIZE = 200
+SENDERS = 400
+# derived after the community account, funded at genesis
+SENDERS_START = 1000
+SENDER_COINS = [{"denom": "basetely", "amount": "1000000000000000000"}]
+PRICE_LEVELS = 10
+SAMPLE_INTERVAL = 0.5
+# the metric name suffixes, the namespace depends on the tendermint version
+RECHECK_METRIC = "mempool_recheck_times"
+EVICTED_METRIC = "mempool_evicted_txs"
+
+
+def prometheus_port(base_port):
+    "the port after the ones allocated by pystarport"
+    return base_port + 9
+
+
+@functools.lru_cache()
+def derive_senders():
+    return derive_accounts(SENDERS, os.getenv("COMMUNITY_MNEMONIC"), SENDERS_START)
+
+
+def post_init(path, base_port, config):
+    "fund the senders, limit the mempool size and expose the prometheus metrics"
+    chain_id = "elysium_777-1"
+    add_genesis_accounts(
+        path / chain_id / "genesis.json",
+        [address for address, _ in derive_senders()],
+        SENDER_COINS,
+    )
+    cfg = json.loads((path / chain_id / "config.json").read_text())
+    for i, val in enumerate(cfg["validators"]):
+        config_path = path / chain_id / f"node{i}/config/config.toml"
+        doc = tomlkit.parse(config_path.read_text())
+        doc["mempool"]["size"] = MEMPOOL_SIZE
+        doc["instrumentation"]["prometheus"] = True
+        doc["instrumentation"][
+            "prometheus_listen_addr"
+        ] = f":{prometheus_port(val['base_port'])}"
+        config_path.write_text(tomlkit.dumps(doc))
+
+
+@pytest.fixture(scope="module")
+def senders():
+    return derive_senders()
+
+
+@pytest.fixture(scope="module")
+def elysium_flood(cluster_pool):
+    return cluster_pool.acquire(
+        Path(__file__).parent / "configs/long_timeout_commit.jsonnet",
+        post_init=post_init,
+    )
+
+
+class Sampler:
+    "sample the mempool size and metrics of the node in a background thread"
+
+    def __init__(self, elysium, i=0):
+        self.rpc_url = elysium.node_rpc_http(i)
+        self.metrics_url = (
+            f"http://127.0.0.1:{prometheus_port(elysium.base_port(i))}/metrics"
+        )
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def sample(self, session):
+        status = session.get(f"{self.rpc_url}/status").json()["result"]
+        unconfirmed = session.get(f"{self.rpc_url}/num_unconfirmed_txs").json()
+        metrics = prometheus_metrics(
+            session, self.metrics_url, [RECHECK_METRIC, EVICTED_METRIC]
+        )
+        return {
+            "time": time.monotonic(),
+            "height": int(status["sync_info"]["latest_block_height"]),
+            "pending": int(unconfirmed["result"]["n_txs"]),
+            "rechecks": metrics.get(RECHECK_METRIC),
+            "evicted": metrics.get(EVICTED_METRIC),
+        }
+
+    def _run(self):
+        with requests.Session() as session:
+            while not self._stop.is_set():
+                try:
+                    self.samples.append(self.sample(session))
+                except (requests.RequestException, AssertionError) as e:
+                    print("sample mempool failed", e)
+                self._stop.wait(SAMPLE_INTERVAL)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._stop.set()
+        self._thread.join()
+
+    def per_block(self):
+        "the recheck count of each block, from the first sample of the next block"
+        blocks = []
+        prev = None
+        for sample in self.samples:
+            if prev is not None and sample["height"] > prev["height"]:
+                rechecks = None
+                if sample["rechecks"] is not None and prev["rechecks"] is not None:
+                    rechecks = sample["rechecks"] - prev["rechecks"]
+                blocks.append(
+                    {
+                        "height": sample["height"],
+                        "pending_before": prev["pending"],
+                        "pending_after": sample["pending"],
+                        "rechecks": rechecks,
+                    }
+                )
+            prev = sample
+        return blocks
+
+
+class PendingWatcher:
+    "poll the pending tx filter, record the time each tx is seen"
+
+    def __init__(self, w3, interval=0.1):
+        self.w3 = w3
+        self.interval = interval
+        self.filter = w3.eth.filter("pending")
+        self.seen = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            now = time.monotonic()
+            for txhash in self.filter.get_new_entries():
+                self.seen.setdefault(HexBytes(txhash), now)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._stop.set()
+        self._thread.join()
+
+
+async def submit_all(endpoint, raw_txs, concurrency=50):
+    """
+    send the raw txs concurrently,
+    return `[(begin, end, error)]` in the same order.
+    """
+    results = [None] * len(raw_txs)
+    it = iter(enumerate(raw_txs))
+
+    async def worker(session):
+        for i, raw in it:
+            begin = time.monotonic()
+            async with session.post(
+                endpoint,
+                json={
+                    "jsonrpc": "2.0",
+                    "id": i,
+                    "method": "eth_sendRawTransaction",
+                    "params": [HexBytes(raw).hex()],
+                },
+            ) as rsp:
+                rsp = await rsp.json()
+            end = time.monotonic()
+            error = rsp.get("error", {}).get("message")
+            results[i] = (begin, end, error)
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await asyncio.gather(*[worker(session) for _ in range(concurrency)])
+    return results
+
+
+def test_mempool_flood(elysium_flood, senders):
+    """
+    flood the mempool with one tx per sender at different gas prices,
+    measure the admission latency, the pending filter lag, which prices are evicted
+    and the recheck count per block.
+    """
+    w3 = elysium_flood.w3
+    gas_price = w3.eth.gas_price
+    chain_id = w3.eth.chain_id
+    txs = []
+    for i, (_, key) in enumerate(senders):
+        level = i % PRICE_LEVELS + 1
+        signed = Account.from_key(key).sign_transaction(
+            {
+                "to": ADDRS["community"],
+                "value": 1,
+                "gas": 21000,
+                "gasPrice": gas_price * level,
+                "nonce": 0,
+                "chainId": chain_id,
+            }
+        )
+        txs.append((level, signed.hash, signed.rawTransaction))
+    random.shuffle(txs)
+
+    endpoint = elysium_flood.w3_http_endpoint()
+    start = w3.eth.block_number + 1
+    with Sampler(elysium_flood) as sampler, PendingWatcher(w3) as watcher:
+        results = asyncio.run(submit_all(endpoint, [raw for _, _, raw in txs]))
+        # let the mempool drain
+        w3_wait_for_new_blocks(w3, 2)
+    end = w3.eth.block_number
+
+    # the drained blocks are empty, their receipts are null
+    included = {
+        HexBytes(receipt.transactionHash)
+        for receipt in iter_block_receipts(w3, start, end, endpoint=endpoint)
+    }
+    admission = []
+    lags = []
+    errors = {}
+    levels = {
+        level: {"included": 0, "evicted": 0} for level in range(1, PRICE_LEVELS + 1)
+    }
+    for (level, txhash, _), (begin, admitted, error) in zip(txs, results):
+        if error is not None:
+            errors[error] = errors.get(error, 0) + 1
+            continue
+        admission.append(admitted - begin)
+        if txhash in watcher.seen:
+            lags.append(max(watcher.seen[txhash] - admitted, 0))
+        levels[level]["included" if txhash in included else "evicted"] += 1
+
+    begin = sampler.samples[0]["time"] if sampler.samples else 0
+    report = {
+        "submitted": len(txs),
+        "admitted": len(admission),
+        "rejected": errors,
+        "admission_p50": percentile(admission, 50),
+        "admission_p99": percentile(admission, 99),
+        "pending_lag_p50": percentile(lags, 50),
+        "pending_lag_p99": percentile(lags, 99),
+        "pending_unseen": len(admission) - len(lags),
+        # price level -> included/evicted counts
+        "price_levels": levels,
+        "blocks": sampler.per_block(),
+        "series": [dict(s, time=s["time"] - begin) for s in sampler.samples],
+    }
+    print("mempool report", json.dumps(report, indent=2), sep="\n")
+    assert report["admitted"] > 0
+    # the higher priced txs should not be evicted more than the lower priced ones
+    assert levels[PRICE_LEVELS]["evicted"] <= levels[1]["evicted"]
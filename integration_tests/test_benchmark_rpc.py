@@ -0,0 +1,82 @@
+import json
+
+import pytest
+from eth_account import Account
+from eth_utils import keccak
+from hexbytes import HexBytes
+
+from .loadgen import compare_rpc
+from .utils import ADDRS, CONTRACTS, deploy_contract, send_transactions
+
+pytestmark = pytest.mark.benchmark
+
+HOLDERS = 100
+# requests per benchmark case
+TOTAL = 5000
+
+
+@pytest.fixture(scope="module")
+def state(elysium):
+    """
+    deploy an erc20 contract and transfer to many holders twice,
+    the historical height is between the two rounds of transfers.
+    """
+    w3 = elysium.w3
+    contract = deploy_contract(w3, CONTRACTS["TestERC20A"])
+    holders = [Account.create().address for _ in range(HOLDERS)]
+
+    def transfer_all(amount):
+        txs = [
+            contract.functions.transfer(holder, amount).build_transaction(
+                {"from": ADDRS["validator"], "gas": 100000}
+            )
+            for holder in holders
+        ]
+        receipts = send_transactions(w3, txs)
+        assert all(receipt.status == 1 for receipt in receipts)
+        return max(receipt.blockNumber for receipt in receipts)
+
+    historical = transfer_all(1)
+    transfer_all(2)
+    return contract, holders, historical
+
+
+def balance_slot(holder):
+    "storage slot of the `_balances` mapping, which is the first state variable"
+    return keccak(HexBytes(holder).rjust(32, b"\0") + b"\0" * 32)
+
+
+def build_payloads(method, contract, holders, block):
+    payloads = []
+    for i in range(TOTAL):
+        holder = holders[i % len(holders)]
+        if method == "eth_getBalance":
+            params = [holder, block]
+        elif method == "eth_call":
+            data = contract.encodeABI(fn_name="balanceOf", args=[holder])
+            params = [{"to": contract.address, "data": data}, block]
+        else:
+            params = [contract.address, HexBytes(balance_slot(holder)).hex(), block]
+        payloads.append({"jsonrpc": "2.0", "id": i, "method": method, "params": params})
+    return payloads
+
+
+@pytest.mark.parametrize("height", ["latest", "historical"])
+@pytest.mark.parametrize("method", ["eth_getBalance", "eth_call", "eth_getStorageAt"])
+def test_rpc_memiavl_vs_iavl(elysium, state, method, height):
+    """
+    node0 runs memiavl and versiondb while node1 runs iavl,
+    send the same queries to both of them concurrently and compare.
+    """
+    contract, holders, historical = state
+    block = "latest" if height == "latest" else hex(historical)
+    payloads = build_payloads(method, contract, holders, block)
+    report = compare_rpc(
+        {
+            "memiavl": elysium.w3_http_endpoint(0),
+            "iavl": elysium.w3_http_endpoint(1),
+        },
+        payloads,
+    )
+    print("rpc report", method, height, json.dumps(report, indent=2), sep="\n")
+    assert all(stats["errors"] == 0 for stats in report.values())
@@ -0,0 +1,279 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+import pytest
+import requests
+import tomlkit
+from dateutil.parser import isoparse
+from pystarport import cluster, ports
+
+from .genesis_utils import generate_large_genesis
+from .utils import ADDRS, wait_for_block
+
+pytestmark = pytest.mark.benchmark
+
+# the size of the synthetic state in the genesis
+STATE = {
+    "accounts": int(os.getenv("ELYSIUM_STATESYNC_ACCOUNTS", 20000)),
+    "contracts": int(os.getenv("ELYSIUM_STATESYNC_CONTRACTS", 200)),
+    "slots": int(os.getenv("ELYSIUM_STATESYNC_SLOTS", 100)),
+    "token_mappings": 0,
+}
+SNAPSHOT_INTERVAL = int(os.getenv("ELYSIUM_SNAPSHOT_INTERVAL", 10))
+RESTORE_TIMEOUT = 600
+SAMPLE_INTERVAL = 0.1
+# node0 runs memiavl while node1 runs iavl, see `configs/default.jsonnet`
+PROVIDERS = {"memiavl": 0, "iavl": 1}
+
+
+def post_init(path, base_port, config):
+    "seed the synthetic state and force the snapshot interval"
+    chain_id = "elysium_777-1"
+    generate_large_genesis(path / chain_id / "genesis.json", **STATE)
+    cfg = json.loads((path / chain_id / "config.json").read_text())
+    for i in range(len(cfg["validators"])):
+        config_path = path / chain_id / f"node{i}/config/app.toml"
+        doc = tomlkit.parse(config_path.read_text())
+        doc["state-sync"]["snapshot-interval"] = SNAPSHOT_INTERVAL
+        config_path.write_text(tomlkit.dumps(doc))
+
+
+@pytest.fixture(scope="module")
+def elysium_state(cluster_pool):
+    return cluster_pool.acquire(
+        Path(__file__).parent / "configs/default.jsonnet", post_init=post_init
+    )
+
+
+def block_time(elysium, height, i=0):
+    rsp = requests.get(f"{elysium.node_rpc_http(i)}/block", {"height": height})
+    return isoparse(rsp.json()["result"]["block"]["header"]["time"]).timestamp()
+
+
+def list_snapshots(home):
+    """
+    the snapshots in the local store of the node, `{height: [(mtime, size)]}`,
+    the chunk files are saved in `data/snapshots/{height}/{format}/{index}`.
+    """
+    snapshots = {}
+    root = Path(home) / "data/snapshots"
+    for d in root.glob("*/*"):
+        if not d.parent.name.isdigit():
+            continue
+        chunks = []
+        for f in d.iterdir():
+            st = f.stat()
+            chunks.append((st.st_mtime, st.st_size))
+        snapshots[int(d.parent.name)] = chunks
+    return snapshots
+
+
+def wait_for_snapshots(home, n=1, timeout=RESTORE_TIMEOUT):
+    """
+    wait until the node has created `n` complete snapshots, the snapshots are taken
+    one at a time, so a snapshot is complete once a newer one is started.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        snapshots = list_snapshots(home)
+        if len(snapshots) > n:
+            del snapshots[max(snapshots)]
+            return snapshots
+        time.sleep(1)
+    raise TimeoutError(f"snapshots are not created in {timeout}s")
+
+
+class RestoreWatcher:
+    """
+    watch the chunks fetched by the state sync node in its temp directory,
+    and the time it becomes queryable.
+    """
+
+    def __init__(self, temp_dir, rpc_url, w3_endpoint):
+        self.temp_dir = Path(temp_dir)
+        self.rpc_url = rpc_url
+        self.w3_endpoint = w3_endpoint
+        # chunk file -> (mtime, size)
+        self.chunks = {}
+        self.restored_at = None
+        self.restored_height = None
+        self.queryable_at = None
+        self.existing = set(self.temp_dir.glob("tm-statesync*"))
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def poll_chunks(self):
+        for d in self.temp_dir.glob("tm-statesync*"):
+            if d in self.existing:
+                continue
+            for f in d.glob("*"):
+                if f not in self.chunks:
+                    try:
+                        st = f.stat()
+                    except FileNotFoundError:
+                        # removed after the restore
+                        continue
+                    self.chunks[f] = (st.st_mtime, st.st_size)
+
+    def poll_node(self, session):
+        if self.restored_at is None:
+            status = session.get(f"{self.rpc_url}/status").json()["result"]
+            height = int(status["sync_info"]["latest_block_height"])
+            if height > 0:
+                self.restored_at = time.time()
+                self.restored_height = height
+        if self.queryable_at is None:
+            rsp = session.post(
+                self.w3_endpoint,
+                json={
+                    "jsonrpc": "2.0",
+                    "id": 1,
+                    "method": "eth_getBalance",
+                    "params": [ADDRS["community"], "latest"],
+                },
+            ).json()
+            if int(rsp.get("result") or "0x0", 16) > 0:
+                self.queryable_at = time.time()
+
+    def _run(self):
+        with requests.Session() as session:
+            while not self._stop.is_set():
+                self.poll_chunks()
+                try:
+                    self.poll_node(session)
+                except (requests.RequestException, ValueError):
+                    # the servers are not started yet
+                    pass
+                self._stop.wait(SAMPLE_INTERVAL)
+
+    def wait(self, timeout=RESTORE_TIMEOUT):
+        deadline = time.monotonic() + timeout
+        while self.queryable_at is None or self.restored_at is None:
+            assert time.monotonic() < deadline, "state sync is not finished in time"
+            time.sleep(SAMPLE_INTERVAL)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._stop.set()
+        self._thread.join()
+
+
+def create_statesync_node(elysium, provider):
+    """
+    create a state sync node which only connects to the provider node,
+    with the same db backend as the provider.
+    """
+    clustercli = cluster.ClusterCLI(
+        elysium.base_dir.parent, cmd="elysiumd", chain_id=elysium.config["chain_id"]
+    )
+    i = clustercli.create_node(moniker=f"statesync{provider}", statesync=True)
+    home = clustercli.home(i)
+
+    app_toml = home / "config/app.toml"
+    app_toml.write_text((clustercli.home(provider) / "config/app.toml").read_text())
+    cluster.edit_app_cfg(
+        app_toml,
+        clustercli.base_port(i),
+        {
+            "json-rpc": {
+                "address": "0.0.0.0:{EVMRPC_PORT}",
+                "ws-address": "0.0.0.0:{EVMRPC_PORT_WS}",
+            }
+        },
+    )
+    doc = tomlkit.parse(app_toml.read_text())
+    # the versiondb is not restored by state sync
+    doc.get("store", {}).pop("streamers", None)
+    app_toml.write_text(tomlkit.dumps(doc))
+
+    config_toml = home / "config/config.toml"
+    doc = tomlkit.parse(config_toml.read_text())
+    peer = clustercli.node_id(provider) + "@127.0.0.1:%d" % ports.p2p_port(
+        clustercli.base_port(provider)
+    )
+    doc["p2p"]["persistent_peers"] = peer
+    # don't discover or accept the other validators
+    doc["p2p"]["pex"] = False
+    doc["p2p"]["max_num_inbound_peers"] = 0
+    config_toml.write_text(tomlkit.dumps(doc))
+    return clustercli, i
+
+
+def snapshot_report(elysium, provider, snapshots):
+    report = []
+    for height, chunks in sorted(snapshots.items()):
+        mtimes = [mtime for mtime, _ in chunks]
+        report.append(
+            {
+                "height": height,
+                "chunks": len(chunks),
+                "size": sum(size for _, size in chunks),
+                # from the block time to the last chunk written
+                "creation_time": max(mtimes) - block_time(elysium, height, provider),
+                "write_time": max(mtimes) - min(mtimes),
+            }
+        )
+    return report
+
+
+@pytest.mark.parametrize("provider", PROVIDERS)
+def test_statesync_memiavl_vs_iavl(elysium_state, provider):
+    """
+    create snapshots on the provider and restore a new node from it with state sync,
+    measure the snapshot creation, the chunk fetching, the apply and the time to
+    the first successful query.
+    """
+    elysium = elysium_state
+    p = PROVIDERS[provider]
+    cli = elysium.cosmos_cli(p)
+    snapshots = wait_for_snapshots(cli.data_dir)
+
+    clustercli, i = create_statesync_node(elysium, p)
+    base_port = clustercli.base_port(i)
+    watcher = RestoreWatcher(
+        clustercli.data_dir,
+        "http://127.0.0.1:%d" % ports.rpc_port(base_port),
+        "http://127.0.0.1:%d" % ports.evmrpc_port(base_port),
+    )
+    try:
+        with watcher:
+            started_at = time.time()
+            clustercli.supervisor.startProcess(f"{clustercli.chain_id}-node{i}")
+            watcher.wait()
+        assert watcher.chunks, "no chunks fetched"
+        # state sync continues with the block sync
+        wait_for_block(
+            clustercli.cosmos_cli(i),
+            int(cli.status()["SyncInfo"]["latest_block_height"]),
+        )
+        assert not clustercli.status(i)["SyncInfo"]["catching_up"]
+    finally:
+        clustercli.supervisor.stopProcess(f"{clustercli.chain_id}-node{i}")
+
+    mtimes = sorted(mtime for mtime, _ in watcher.chunks.values())
+    fetched = sum(size for _, size in watcher.chunks.values())
+    fetch_time = mtimes[-1] - mtimes[0]
+    report = {
+        "provider": provider,
+        "state": STATE,
+        "snapshot_interval": SNAPSHOT_INTERVAL,
+        "snapshots": snapshot_report(elysium, p, snapshots),
+        "restored_height": watcher.restored_height,
+        "chunks_fetched": len(mtimes),
+        "bytes_fetched": fetched,
+        "fetch_time": fetch_time,
+        "chunk_rate": len(mtimes) / fetch_time if fetch_time else None,
+        "byte_rate": fetched / fetch_time if fetch_time else None,
+        "first_chunk_time": mtimes[0] - started_at,
+        # from the last chunk fetched to the state restored
+        "apply_time": watcher.restored_at - mtimes[-1],
+        "restore_time": watcher.restored_at - started_at,
+        "time_to_first_query": watcher.queryable_at - started_at,
+    }
+    print("statesync report", json.dumps(report, indent=2), sep="\n")
@@ -0,0 +1,110 @@
+import asyncio
+import json
+
+import pytest
+from eth_account import Account
+
+from .loadgen import bench_rpc, node_memory
+from .utils import ADDRS, CONTRACTS, deploy_contract, send_transactions
+
+pytestmark = pytest.mark.benchmark
+
+TRACERS = {
+    "struct_logger": {},
+    "struct_logger_light": {"disableStorage": True, "disableStack": True},
+    "call_tracer": {"tracer": "callTracer"},
+}
+
+
+@pytest.fixture(scope="module")
+def blocks(elysium):
+    """
+    generate blocks of different complexity,
+    return `{kind: (tx hashes, block numbers)}`.
+    """
+    w3 = elysium.w3
+    message_call = deploy_contract(w3, CONTRACTS["TestMessageCall"])
+    erc20 = deploy_contract(w3, CONTRACTS["TestERC20A"])
+    revert = deploy_contract(w3, CONTRACTS["TestRevert"])
+    recipients = [Account.create().address for _ in range(20)]
+
+    def call(contract, fn, *args, gas=10000000):
+        return getattr(contract.functions, fn)(*args).build_transaction(
+            {"from": ADDRS["validator"], "gas": gas}
+        )
+
+    kinds = {
+        "erc20_transfer": [
+            call(erc20, "transfer", r, 1, gas=100000) for r in recipients
+        ],
+        "message_call_10": [call(message_call, "test", 10) for _ in range(5)],
+        "message_call_500": [call(message_call, "test", 500) for _ in range(5)],
+        # the value is less than the minimal, skip the gas estimation
+        "revert": [call(revert, "transfer", 1, gas=100000) for _ in range(10)],
+    }
+    result = {}
+    for kind, txs in kinds.items():
+        receipts = send_transactions(w3, txs)
+        assert all(r.status == (0 if kind == "revert" else 1) for r in receipts)
+        result[kind] = (
+            [r.transactionHash.hex() for r in receipts],
+            sorted({r.blockNumber for r in receipts}),
+        )
+    return result
+
+
+@pytest.mark.parametrize("tracer", TRACERS)
+@pytest.mark.parametrize(
+    "kind", ["erc20_transfer", "message_call_10", "message_call_500", "revert"]
+)
+def test_trace(elysium, blocks, kind, tracer):
+    """
+    measure the latency of `debug_traceTransaction` and `debug_traceBlockByNumber`
+    with different tracer options, and the memory of the node.
+    """
+    txhashes, heights = blocks[kind]
+    config = TRACERS[tracer]
+    endpoint = elysium.w3_http_endpoint()
+    before = node_memory(elysium)
+    tx_stats = asyncio.run(
+        bench_rpc(
+            endpoint,
+            [
+                {
+                    "jsonrpc": "2.0",
+                    "id": i,
+                    "method": "debug_traceTransaction",
+                    "params": [txhash, config],
+                }
+                for i, txhash in enumerate(txhashes)
+            ],
+            concurrency=4,
+        )
+    )
+    block_stats = asyncio.run(
+        bench_rpc(
+            endpoint,
+            [
+                {
+                    "jsonrpc": "2.0",
+                    "id": i,
+                    "method": "debug_traceBlockByNumber",
+                    "params": [hex(height), config],
+                }
+                for i, height in enumerate(heights)
+            ],
+            concurrency=1,
+        )
+    )
+    after = node_memory(elysium)
+    report = {
+        "txs": len(txhashes),
+        "blocks": len(heights),
+        "trace_tx": tx_stats,
+        "trace_block": block_stats,
+        "rss_before": before["rss"],
+        "rss_after": after["rss"],
+        "peak_rss_growth": after["peak_rss"] - before["peak_rss"],
+    }
+    print("trace report", kind, tracer, json.dumps(report, indent=2), sep="\n")
+    assert tx_stats["errors"] == 0 and block_stats["errors"] == 0
@@ -7,11 +7,12 @@ from eth_account.messages import encode_structured_data
 from pystarport import ports
 
 from .eip712_utils import (
+    Eip712TxBuilder,
     create_message_send,
     create_tx_raw_eip712,
     signature_to_web3_extension,
 )
-from .utils import ADDRS, KEYS
+from .utils import ADDRS, KEYS, wait_for_new_blocks
 
 
 def test_native_tx(elysium):
@@ -82,3 +83,50 @@ def test_native_tx(elysium):
     res = result["tx_response"]
     assert res["code"] == 0, res["raw_log"]
     assert res["gas_wanted"] == str(gas)
+
+
+def test_native_tx_batch(elysium):
+    """
+    sign a batch of eip-712 txs with incrementing sequence and broadcast them
+    """
+    cli = elysium.cosmos_cli(rest=True)
+    w3 = elysium.w3
+    chain_id = w3.eth.chain_id
+    chain = {
+        "chainId": chain_id,
+        "cosmosChainId": f"elysium_{chain_id}-1",
+    }
+    src = "signer1"
+    src_addr = cli.address(src)
+    src_account = cli.account(src_addr)
+    sequence = int(src_account["base_account"]["sequence"])
+    sender = {
+        "accountAddress": src_addr,
+        "sequence": sequence,
+        "accountNumber": int(src_account["base_account"]["account_number"]),
+        "pubkey": json.loads(cli.address(src, "acc", "pubkey"))["key"],
+    }
+    denom = "basetely"
+    dst_addr = cli.address("signer2")
+    gas = 200000
+    gas_price = 100000000000  # default base fee
+    fee = {
+        "amount": str(gas * gas_price),
+        "denom": denom,
+        "gas": str(gas),
+    }
+    params = {
+        "destinationAddress": dst_addr,
+        "amount": "1",
+        "denom": denom,
+    }
+    n = 20
+    builder = Eip712TxBuilder(chain, sender, fee)
+    balance = cli.balance(dst_addr, denom)
+    for tx_bytes in builder.batch_msg_send([params] * n, KEYS[src]):
+        rsp = cli.broadcast_tx_bytes(tx_bytes, mode="BROADCAST_MODE_SYNC")
+        assert rsp["code"] == 0, rsp["raw_log"]
+    wait_for_new_blocks(cli, 2)
+    assert cli.balance(dst_addr, denom) == balance + n
+    src_account = cli.account(src_addr)
+    assert int(src_account["base_account"]["sequence"]) == sequence + n
@@ -3,15 +3,13 @@ from pathlib import Path
 
 import pytest
 
-from .network import setup_custom_elysium
 from .utils import ADDRS, CONTRACTS
 
 
 @pytest.fixture(scope="module")
-def custom_elysium(tmp_path_factory):
-    path = tmp_path_factory.mktemp("elysium")
-    yield from setup_custom_elysium(
-        path, 26000, Path(__file__).parent / "configs/genesis_token_mapping.jsonnet"
+def custom_elysium(cluster_pool):
+    return cluster_pool.acquire(
+        Path(__file__).parent / "configs/genesis_token_mapping.jsonnet"
     )
 
 
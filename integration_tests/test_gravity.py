@@ -75,7 +75,7 @@ def custom_geth(tmp_path_factory):
 
 @pytest.fixture(scope="module", params=[True, False])
 def custom_elysium(request, tmp_path_factory):
-    yield from setup_elysium(tmp_path_factory.mktemp("elysium"), 26600, request.param)
+    yield from setup_elysium(tmp_path_factory.mktemp("elysium"), None, request.param)
 
 
 @pytest.fixture(scope="module")
@@ -0,0 +1,154 @@
+import hashlib
+
+import pytest
+
+from .memiavl_utils import (
+    BRANCH_NODE,
+    EMPTY_HASH,
+    LEAF_NODE,
+    METADATA,
+    SNAPSHOT_FILE_MAGIC,
+    SNAPSHOT_FORMAT,
+    U32,
+    Snapshot,
+    encode_bytes,
+    encode_varint,
+    open_memiavl_db,
+)
+
+
+class SnapshotWriter:
+    """
+    write the sorted key-value pairs as a balanced tree in the snapshot format,
+    the nodes are written in post-order like `snapshotWriter.writeRecursive`.
+    """
+
+    def __init__(self, pairs, version):
+        self.pairs = pairs
+        self.version = version
+        self.nodes = bytearray()
+        self.leaves = bytearray()
+        self.kvs = bytearray()
+        self.branch_counter = 0
+        self.leaf_counter = 0
+
+    def write_recursive(self, begin, end):
+        "return `(height, size, hash)` of the subtree of the pairs in `[begin, end)`"
+        if end - begin == 1:
+            key, value = self.pairs[begin]
+            h = hashlib.sha256(
+                encode_varint(0)
+                + encode_varint(1)
+                + encode_varint(self.version)
+                + encode_bytes(key)
+                + encode_bytes(hashlib.sha256(value).digest())
+            ).digest()
+            self.leaves += LEAF_NODE.pack(self.version, len(key), len(self.kvs), h)
+            self.kvs += U32.pack(len(key)) + key + U32.pack(len(value)) + value
+            self.leaf_counter += 1
+            return 0, 1, h
+
+        pre_trees = self.leaf_counter - self.branch_counter
+        mid = (begin + end + 1) // 2
+        left_height, left_size, left = self.write_recursive(begin, mid)
+        key_leaf = self.leaf_counter
+        right_height, right_size, right = self.write_recursive(mid, end)
+        height = max(left_height, right_height) + 1
+        size = left_size + right_size
+        h = hashlib.sha256(
+            encode_varint(height)
+            + encode_varint(size)
+            + encode_varint(self.version)
+            + encode_bytes(left)
+            + encode_bytes(right)
+        ).digest()
+        self.nodes += BRANCH_NODE.pack(
+            height, pre_trees, self.version, size, key_leaf, h
+        )
+        self.branch_counter += 1
+        return height, size, h
+
+    def write(self, snapshot_dir):
+        "return the root hash"
+        root = EMPTY_HASH
+        if self.pairs:
+            _, _, root = self.write_recursive(0, len(self.pairs))
+        snapshot_dir.mkdir(parents=True)
+        (snapshot_dir / "nodes").write_bytes(self.nodes)
+        (snapshot_dir / "leaves").write_bytes(self.leaves)
+        (snapshot_dir / "kvs").write_bytes(self.kvs)
+        (snapshot_dir / "metadata").write_bytes(
+            METADATA.pack(SNAPSHOT_FILE_MAGIC, SNAPSHOT_FORMAT, self.version)
+        )
+        return root
+
+
+def gen_pairs(n):
+    "keys of different prefixes and values of different sizes"
+    return sorted(
+        (bytes([1 + i % 3]) + b"key%05d" % i, b"v" * (i % 70)) for i in range(n)
+    )
+
+
+@pytest.fixture
+def memiavl_db(tmp_path):
+    "a memiavl db directory with the current snapshot of two trees"
+    trees = {"bank": gen_pairs(300), "empty": []}
+    roots = {
+        name: SnapshotWriter(pairs, 10).write(tmp_path / "snapshot-10" / name)
+        for name, pairs in trees.items()
+    }
+    (tmp_path / "current").symlink_to("snapshot-10")
+    return tmp_path, trees, roots
+
+
+def test_snapshot_reads(memiavl_db):
+    path, trees, roots = memiavl_db
+    snapshots = open_memiavl_db(path)
+    assert sorted(snapshots) == sorted(trees)
+    for name, snapshot in snapshots.items():
+        with snapshot:
+            pairs = trees[name]
+            assert snapshot.version == 10
+            assert len(snapshot) == len(pairs)
+            assert snapshot.root_hash() == roots[name]
+            assert snapshot.verify(), name
+            assert list(snapshot.iterate()) == pairs
+            for key, value in pairs:
+                assert snapshot.get(key) == value
+            assert snapshot.get(b"\x00missing") is None
+
+    with Snapshot(path / "current/bank") as snapshot:
+        pairs = trees["bank"]
+        assert snapshot.get(b"\x02key00001") == pairs[100][1]
+        assert list(snapshot.iterate(b"\x02", b"\x03")) == [
+            (k, v) for k, v in pairs if k[0] == 2
+        ]
+        start, end = pairs[10][0], pairs[20][0]
+        assert list(snapshot.iterate(start, end)) == pairs[10:20]
+
+
+def test_snapshot_verify_corrupted(memiavl_db):
+    path, _, _ = memiavl_db
+    kvs = path / "current/bank/kvs"
+    bz = bytearray(kvs.read_bytes())
+    # the last byte of the last value
+    bz[-1] ^= 0xFF
+    kvs.write_bytes(bz)
+    with Snapshot(path / "current/bank") as snapshot:
+        assert not snapshot.verify()
+
+
+def test_snapshot_scans(memiavl_db):
+    pytest.importorskip("numpy")
+    path, trees, _ = memiavl_db
+    pairs = trees["bank"]
+    with Snapshot(path / "current/bank") as snapshot:
+        counts = {}
+        for key, _ in pairs:
+            counts[key[0]] = counts.get(key[0], 0) + 1
+        assert snapshot.key_prefix_counts() == counts
+        assert snapshot.value_sizes().tolist() == [len(v) for _, v in pairs]
+        histogram = snapshot.value_size_histogram()
+        assert sum(histogram.values()) == len(pairs)
+        assert histogram[0] == sum(1 for _, v in pairs if not v)
@@ -3,7 +3,6 @@ from pathlib import Path
 import pytest
 from web3 import Web3
 
-from .network import setup_custom_elysium
 from .utils import (
     ADDRS,
     CONTRACTS,
@@ -16,10 +15,11 @@ from .utils import (
 
 
 @pytest.fixture(scope="module")
-def elysium_mempool(tmp_path_factory):
-    path = tmp_path_factory.mktemp("elysium-mempool")
-    yield from setup_custom_elysium(
-        path, 26300, Path(__file__).parent / "configs/long_timeout_commit.jsonnet"
+def elysium_mempool(cluster_pool):
+    "the default network with the `timeout_commit` of `long_timeout_commit.jsonnet`"
+    return cluster_pool.acquire(
+        Path(__file__).parent / "configs/default.jsonnet",
+        overrides={"config": {"consensus": {"timeout_commit": "15s"}}},
     )
 
 
@@ -6,7 +6,6 @@ from eth_utils import abi, big_endian_to_int
 from hexbytes import HexBytes
 from web3.datastructures import AttributeDict
 
-from .network import setup_custom_elysium
 from .utils import (
     ADDRS,
     CONTRACTS,
@@ -18,15 +17,11 @@ from .utils import (
 
 
 @pytest.fixture(scope="module")
-def elysium(request, tmp_path_factory):
+def elysium(cluster_pool):
     """start-elysium
     params: enable_auto_deployment
     """
-    yield from setup_custom_elysium(
-        tmp_path_factory.mktemp("pruned"),
-        26900,
-        Path(__file__).parent / "configs/pruned-node.jsonnet",
-    )
+    return cluster_pool.acquire(Path(__file__).parent / "configs/pruned-node.jsonnet")
 
 
 def test_pruned_node(elysium):
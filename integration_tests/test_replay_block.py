@@ -5,15 +5,13 @@ import web3
 from web3._utils.method_formatters import receipt_formatter
 from web3.datastructures import AttributeDict
 
-from .network import setup_custom_elysium
 from .utils import ADDRS, CONTRACTS, KEYS, deploy_contract, sign_transaction
 
 
 @pytest.fixture(scope="module")
-def custom_elysium(tmp_path_factory):
-    path = tmp_path_factory.mktemp("elysium")
-    yield from setup_custom_elysium(
-        path, 26000, Path(__file__).parent / "configs/low_block_gas_limit.jsonnet"
+def custom_elysium(cluster_pool):
+    return cluster_pool.acquire(
+        Path(__file__).parent / "configs/low_block_gas_limit.jsonnet"
     )
 
 
@@ -50,7 +50,7 @@ def custom_elysium(tmp_path_factory):
     # init with genesis binary
     yield from setup_custom_elysium(
         path,
-        26400,
+        None,
         Path(__file__).parent / "configs/rollback.jsonnet",
         post_init=post_init(broken_binary),
         wait_port=False,
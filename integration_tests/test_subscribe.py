@@ -1,15 +1,13 @@
 import asyncio
-import json
 import time
-from collections import defaultdict
 
-import websockets
 from eth_utils import abi
 from hexbytes import HexBytes
 from pystarport import ports
 from web3 import Web3
 
 from .network import Elysium
+from .subscribe_utils import SubscriptionClient
 from .utils import (
     ADDRS,
     CONTRACTS,
@@ -23,60 +21,6 @@ from .utils import (
     wait_for_port,
 )
 
-
-class Client:
-    def __init__(self, ws):
-        self._ws = ws
-        self._gen_id = 0
-        self._subs = defaultdict(asyncio.Queue)
-        self._rsps = defaultdict(asyncio.Queue)
-
-    def gen_id(self):
-        self._gen_id += 1
-        return self._gen_id
-
-    async def receive_loop(self):
-        while True:
-            msg = json.loads(await self._ws.recv())
-            if "id" in msg:
-                # responses
-                await self._rsps[msg["id"]].put(msg)
-            else:
-                # subscriptions
-                assert msg["method"] == "eth_subscription"
-                sub_id = msg["params"]["subscription"]
-                await self._subs[sub_id].put(msg["params"]["result"])
-
-    async def recv_response(self, rpcid):
-        rsp = await self._rsps[rpcid].get()
-        del self._rsps[rpcid]
-        return rsp
-
-    async def recv_subscription(self, sub_id):
-        return await self._subs[sub_id].get()
-
-    async def subscribe(self, *args):
-        rpcid = self.gen_id()
-        await self._ws.send(
-            json.dumps({"id": rpcid, "method": "eth_subscribe", "params": args})
-        )
-        rsp = await self.recv_response(rpcid)
-        assert "error" not in rsp
-        return rsp["result"]
-
-    def sub_qsize(self, sub_id):
-        return self._subs[sub_id].qsize()
-
-    async def unsubscribe(self, sub_id):
-        rpcid = self.gen_id()
-        await self._ws.send(
-            json.dumps({"id": rpcid, "method": "eth_unsubscribe", "params": [sub_id]})
-        )
-        rsp = await self.recv_response(rpcid)
-        assert "error" not in rsp
-        return rsp["result"]
-
-
 # TestEvent topic from TestMessageCall contract calculated from event signature
 TEST_EVENT_TOPIC = Web3.keccak(text="TestEvent(uint256)")
 
@@ -94,25 +38,25 @@ def test_subscribe_basic(elysium: Elysium):
     cli = elysium.cosmos_cli()
     loop = asyncio.get_event_loop()
 
-    async def assert_unsubscribe(c: Client, sub_id):
-        assert await c.unsubscribe(sub_id)
+    async def assert_unsubscribe(c: SubscriptionClient, sub):
+        assert await c.unsubscribe(sub)
         # check no more messages
         await loop.run_in_executor(None, wait_for_new_blocks, cli, 2)
-        assert c.sub_qsize(sub_id) == 0
+        assert sub.qsize() == 0
         # unsubscribe again return False
-        assert not await c.unsubscribe(sub_id)
+        assert not await c.unsubscribe(sub)
 
-    async def subscriber_test(c: Client):
-        sub_id = await c.subscribe("newHeads")
+    async def subscriber_test(c: SubscriptionClient):
+        sub = await c.subscribe("newHeads")
         # wait for three new blocks
-        msgs = [await c.recv_subscription(sub_id) for i in range(3)]
+        msgs = [await sub.recv() for i in range(3)]
         # check blocks are consecutive
         assert int(msgs[1]["number"], 0) == int(msgs[0]["number"], 0) + 1
         assert int(msgs[2]["number"], 0) == int(msgs[1]["number"], 0) + 1
-        await assert_unsubscribe(c, sub_id)
+        await assert_unsubscribe(c, sub)
 
-    async def transfer_test(c: Client, w3, contract, address):
-        sub_id = await c.subscribe("logs", {"address": address})
+    async def transfer_test(c: SubscriptionClient, w3, contract, address):
+        sub = await c.subscribe("logs", {"address": address})
         to = ADDRS["community"]
         _from = ADDRS["validator"]
         total = 5
@@ -132,12 +76,12 @@ def test_subscribe_basic(elysium: Elysium):
                 "data": HexBytes(b"\x00" * 31 + HexBytes(amt)),
             }
             assert expect_log.items() <= txreceipt.logs[0].items()
-        msgs = [await c.recv_subscription(sub_id) for i in range(total)]
+        msgs = [await sub.recv() for i in range(total)]
         assert len(msgs) == total
-        await assert_unsubscribe(c, sub_id)
+        await assert_unsubscribe(c, sub)
 
-    async def logs_test(c: Client, w3, contract, address):
-        sub_id = await c.subscribe("logs", {"address": address})
+    async def logs_test(c: SubscriptionClient, w3, contract, address):
+        sub = await c.subscribe("logs", {"address": address})
         iterations = 10000
         tx = contract.functions.test(iterations).build_transaction()
         raw_transactions = []
@@ -146,15 +90,14 @@ def test_subscribe_basic(elysium: Elysium):
             raw_transactions.append(signed.rawTransaction)
         send_raw_transactions(w3, raw_transactions)
         total = len(KEYS) * iterations
-        msgs = [await c.recv_subscription(sub_id) for i in range(total)]
+        msgs = [await sub.recv() for i in range(total)]
         assert len(msgs) == total
         assert all(msg["topics"] == [TEST_EVENT_TOPIC.hex()] for msg in msgs)
-        await assert_unsubscribe(c, sub_id)
+        assert sub.dropped == 0
+        await assert_unsubscribe(c, sub)
 
     async def async_test():
-        async with websockets.connect(elysium.w3_ws_endpoint()) as ws:
-            c = Client(ws)
-            t = asyncio.create_task(c.receive_loop())
+        async with SubscriptionClient(elysium.w3_ws_endpoint()) as c:
             # run three subscribers concurrently
             await asyncio.gather(*[subscriber_test(c) for i in range(3)])
             contract = deploy_contract(elysium.w3, CONTRACTS["TestERC20A"])
@@ -165,11 +108,7 @@ def test_subscribe_basic(elysium: Elysium):
             begin = time.time()
             await asyncio.gather(*[logs_test(c, elysium.w3, contract, inner)])
             print("msg call time", time.time() - begin)
-            t.cancel()
-            try:
-                await t
-            except asyncio.CancelledError:
-                pass
+            print("subscriptions", c.stats())
 
     timeout = 100
     loop.run_until_complete(asyncio.wait_for(async_test(), timeout))
@@ -73,7 +73,7 @@ def custom_elysium(tmp_path_factory):
     # init with genesis binary
     yield from setup_custom_elysium(
         path,
-        26100,
+        None,
         Path(__file__).parent / "configs/cosmovisor.jsonnet",
         post_init=post_init,
         chain_binary=str(path / "upgrades/genesis/bin/elysiumd"),
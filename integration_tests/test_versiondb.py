@@ -1,10 +1,16 @@
+import importlib.util
 import shutil
 import tempfile
+from pathlib import Path
 
 import tomlkit
+from hexbytes import HexBytes
 from pystarport import ports
 
+from .changeset_utils import query_key_history
+from .memiavl_utils import open_multitree
 from .network import Elysium
+from .protobuf.cosmos.base.v1beta1.coin_pb2 import Coin
 from .utils import ADDRS, send_transaction, wait_for_port
 
 
@@ -46,11 +52,29 @@ def test_versiondb_migration(elysium: Elysium):
     changeset_dir = tempfile.mkdtemp(dir=elysium.base_dir)
     print("dump to:", changeset_dir)
     print(cli1.changeset_dump(changeset_dir))
+    # check the balance change of the transfer in the dumped change sets
+    key = balance_key(community, "basetely")
+    writes = list(
+        query_key_history(Path(changeset_dir) / "bank", key, block0 + 1, block1)
+    )
+    assert len(writes) == 1, writes
+    _, pair = writes[0]
+    assert Coin.FromString(pair.value).amount == str(balance1)
     snapshot_dir = tempfile.mkdtemp(dir=elysium.base_dir)
     print("verify and save to snapshot:", snapshot_dir)
     _, commit_info = cli0.changeset_verify(changeset_dir, save_snapshot=snapshot_dir)
     latest_version = commit_info["version"]
 
+    # read the saved snapshot, the trees are built from the change sets
+    trees = open_multitree(snapshot_dir)
+    assert trees, f"no trees in the snapshot: {snapshot_dir}"
+    for name, snapshot in trees.items():
+        with snapshot:
+            assert snapshot.verify(), name
+            if name == "bank":
+                check_memiavl_reads(snapshot, key, str(balance1))
+    assert "bank" in trees
+
     # replace existing `application.db`
     app_db1 = cli1.data_dir / "data/application.db"
     print("replace node db:", app_db1)
@@ -94,6 +118,30 @@ def test_versiondb_migration(elysium: Elysium):
     )
 
 
+def balance_key(addr, denom):
+    "the bank store key of the balance"
+    addr = HexBytes(addr)
+    return b"\x02" + bytes([len(addr)]) + addr + denom.encode()
+
+
+def check_memiavl_reads(snapshot, key, amount):
+    "read the balance key through the lookup, the range scan and the leaf scans"
+    value = snapshot.get(key)
+    assert value is not None
+    coin = Coin.FromString(value)
+    assert coin.denom == "basetely" and coin.amount == amount
+    assert list(snapshot.iterate(key, key + b"\x00")) == [(key, value)]
+    balances = list(snapshot.iterate(b"\x02", b"\x03"))
+    assert (key, value) in balances
+    if importlib.util.find_spec("numpy") is None:
+        # the leaf scans need numpy
+        return
+    assert snapshot.key_prefix_counts()[0x02] == len(balances)
+    sizes = snapshot.value_sizes()
+    assert len(sizes) == len(snapshot)
+    assert sum(sizes) == sum(len(v) for _, v in snapshot.iterate())
+
+
 def patch_app_db_backend(path, backend):
     cfg = tomlkit.parse(path.read_text())
     cfg["app-db-backend"] = backend
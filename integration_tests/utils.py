@@ -1,19 +1,23 @@
 import base64
 import configparser
+import fcntl
 import json
 import os
 import re
 import socket
 import subprocess
 import sys
+import threading
 import time
-from collections import defaultdict
+from collections import defaultdict, deque
+from collections.abc import Mapping
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 import bech32
 import eth_utils
 import pytest
+import requests
 import rlp
 import toml
 from dateutil.parser import isoparse
@@ -24,18 +28,67 @@ from pystarport import ledger
 from web3._utils.method_formatters import receipt_formatter
 from web3._utils.transactions import fill_nonce, fill_transaction_defaults
 from web3.datastructures import AttributeDict
+from web3.exceptions import TransactionNotFound
+
+from .block_events import block_subscriber
 
 load_dotenv(Path(__file__).parent.parent / "scripts/.env")
 Account.enable_unaudited_hdwallet_features()
-ACCOUNTS = {
-    "validator": Account.from_mnemonic(os.getenv("VALIDATOR1_MNEMONIC")),
-    "validator2": Account.from_mnemonic(os.getenv("VALIDATOR2_MNEMONIC")),
-    "community": Account.from_mnemonic(os.getenv("COMMUNITY_MNEMONIC")),
-    "signer1": Account.from_mnemonic(os.getenv("SIGNER1_MNEMONIC")),
-    "signer2": Account.from_mnemonic(os.getenv("SIGNER2_MNEMONIC")),
-}
-KEYS = {name: account.key for name, account in ACCOUNTS.items()}
-ADDRS = {name: account.address for name, account in ACCOUNTS.items()}
+
+
+class LazyAccounts(Mapping):
+    """
+    derive the accounts from the mnemonics in the environment on first access,
+    the key stretching of each mnemonic is slow.
+    """
+
+    def __init__(self, mnemonic_envs):
+        self._envs = mnemonic_envs
+        self._accounts = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name):
+        with self._lock:
+            if name not in self._accounts:
+                mnemonic = os.getenv(self._envs[name])
+                self._accounts[name] = Account.from_mnemonic(mnemonic)
+            return self._accounts[name]
+
+    def __iter__(self):
+        return iter(self._envs)
+
+    def __len__(self):
+        return len(self._envs)
+
+
+class AccountsView(Mapping):
+    "an attribute of the lazy accounts, like the keys or the addresses"
+
+    def __init__(self, accounts, attr):
+        self._accounts = accounts
+        self._attr = attr
+
+    def __getitem__(self, name):
+        return getattr(self._accounts[name], self._attr)
+
+    def __iter__(self):
+        return iter(self._accounts)
+
+    def __len__(self):
+        return len(self._accounts)
+
+
+ACCOUNTS = LazyAccounts(
+    {
+        "validator": "VALIDATOR1_MNEMONIC",
+        "validator2": "VALIDATOR2_MNEMONIC",
+        "community": "COMMUNITY_MNEMONIC",
+        "signer1": "SIGNER1_MNEMONIC",
+        "signer2": "SIGNER2_MNEMONIC",
+    }
+)
+KEYS = AccountsView(ACCOUNTS, "key")
+ADDRS = AccountsView(ACCOUNTS, "address")
 ELYSIUM_ADDRESS_PREFIX = "frc"
 TEST_CONTRACTS = {
     "Gravity": "Gravity.sol",
@@ -89,7 +142,14 @@ def wait_for_fn(name, fn, *, timeout=240, interval=1):
 
 
 def wait_for_block(cli, height, timeout=240):
-    for i in range(timeout * 2):
+    sub = block_subscriber(cli)
+    if sub is not None:
+        begin = time.monotonic()
+        if sub.wait(lambda h, _: h >= height, timeout) is not None:
+            return
+        # subscription not available, fallback to polling
+        timeout = max(timeout - (time.monotonic() - begin), 0)
+    for i in range(int(timeout * 2)):
         try:
             status = cli.status()
         except AssertionError as e:
@@ -104,7 +164,15 @@ def wait_for_block(cli, height, timeout=240):
         raise TimeoutError(f"wait for block {height} timeout")
 
 
-def wait_for_new_blocks(cli, n, sleep=0.5):
+def wait_for_new_blocks(cli, n, sleep=0.5, timeout=None):
+    sub = block_subscriber(cli)
+    if sub is not None:
+        latest = sub.wait(lambda h, _: True, timeout)
+        if latest is not None:
+            target = latest[0] + n
+            latest = sub.wait(lambda h, _: h >= target, timeout)
+            if latest is not None:
+                return latest[0]
     cur_height = begin_height = int((cli.status())["SyncInfo"]["latest_block_height"])
     while cur_height - begin_height < n:
         time.sleep(sleep)
@@ -114,6 +182,9 @@ def wait_for_new_blocks(cli, n, sleep=0.5):
 
 def wait_for_block_time(cli, t):
     print("wait for block time", t)
+    sub = block_subscriber(cli)
+    if sub is not None and sub.wait(lambda _, now: now >= t, None) is not None:
+        return
     while True:
         now = isoparse((cli.status())["SyncInfo"]["latest_block_time"])
         print("block time now:", now)
@@ -127,9 +198,12 @@ def approve_proposal(n, rsp):
     # get proposal_id
     ev = parse_events(rsp["logs"])["submit_proposal"]
     proposal_id = ev["proposal_id"]
-    for i in range(len(n.config["validators"])):
+
+    def vote(i):
         rsp = n.cosmos_cli(i).gov_vote("validator", proposal_id, "yes")
         assert rsp["code"] == 0, rsp["raw_log"]
+
+    n.for_each_node(vote)
     wait_for_new_blocks(cli, 1)
     assert (
         int(cli.query_tally(proposal_id)["yes_count"]) == cli.staking_pool()
@@ -219,13 +293,55 @@ def parse_events_rpc(events):
     return result
 
 
-_next_unique = 0
+PORT_RANGE_SIZE = 100
+FIRST_BASE_PORT = 10000
+# below the default ephemeral port range of linux
+LAST_BASE_PORT = 32000
+
+
+def session_temp_root(tmp_path):
+    """
+    the temp directory shared by all the pytest-xdist workers of the session,
+    `tmp_path` is a directory created by `tmp_path_factory.mktemp`.
+    """
+    basetemp = Path(tmp_path).parent
+    if os.environ.get("PYTEST_XDIST_WORKER"):
+        # the workers' basetemps are `{root}/popen-gw{n}`
+        return basetemp.parent
+    return basetemp
 
 
-def gen_base_port(worker_index):
-    global _next_unique
-    base_port = 10000 + (worker_index * 10 + _next_unique) * 100
-    _next_unique += 1
+def port_range_free(base_port, size=PORT_RANGE_SIZE):
+    for port in range(base_port, base_port + size):
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            try:
+                sock.bind(("127.0.0.1", port))
+            except OSError:
+                return False
+    return True
+
+
+def allocate_base_port(tmp_path, size=PORT_RANGE_SIZE):
+    """
+    allocate a range of `size` ports which don't overlap with the other fixtures,
+    including the ones in the other pytest-xdist workers, the allocation counter is
+    saved in a lock file in the session temp directory, and the ranges in use by
+    other processes are skipped.
+    """
+    lock_path = session_temp_root(tmp_path) / "ports.lock"
+    with open(lock_path, "a+") as fp:
+        fcntl.flock(fp, fcntl.LOCK_EX)
+        fp.seek(0)
+        next_port = int(fp.read() or FIRST_BASE_PORT)
+        while True:
+            base_port = next_port
+            next_port += size
+            assert next_port <= LAST_BASE_PORT, "run out of ports"
+            if port_range_free(base_port, size):
+                break
+        fp.seek(0)
+        fp.truncate()
+        fp.write(str(next_port))
     return base_port
 
 
@@ -300,10 +416,12 @@ def supervisorctl(inipath, *args):
     ).decode()
 
 
-def deploy_contract(w3, jsonfile, args=(), key=KEYS["validator"]):
+def deploy_contract(w3, jsonfile, args=(), key=None):
     """
     deploy contract and return the deployed contract instance
     """
+    if key is None:
+        key = KEYS["validator"]
     acct = Account.from_key(key)
     info = json.loads(jsonfile.read_text())
     bytecode = ""
@@ -327,8 +445,90 @@ def get_contract(w3, address, jsonfile):
     return w3.eth.contract(address=address, abi=info["abi"])
 
 
-def sign_transaction(w3, tx, key=KEYS["validator"]):
+class NonceManager:
+    """
+    fill the transactions locally to save the json-rpc round trips:
+    - track the pending nonce of each sender after fetched once from the chain.
+    - cache the gas price for `gas_price_ttl` seconds, roughly one block.
+    - cache the chain id.
+
+    it assumes the managed senders don't send txs through other channels,
+    call `reset` to re-sync a sender's nonce with the chain.
+    """
+
+    def __init__(self, w3, gas_price_ttl=1):
+        self.w3 = w3
+        self.gas_price_ttl = gas_price_ttl
+        self._nonces = {}
+        self._gas_price = None
+        self._gas_price_time = 0
+        self._chain_id = None
+        self._lock = threading.Lock()
+
+    @property
+    def chain_id(self):
+        if self._chain_id is None:
+            self._chain_id = self.w3.eth.chain_id
+        return self._chain_id
+
+    def gas_price(self):
+        with self._lock:
+            now = time.monotonic()
+            expired = now - self._gas_price_time > self.gas_price_ttl
+            if self._gas_price is None or expired:
+                self._gas_price = self.w3.eth.gas_price
+                self._gas_price_time = now
+            return self._gas_price
+
+    def next_nonce(self, address):
+        with self._lock:
+            if address not in self._nonces:
+                self._nonces[address] = self.w3.eth.get_transaction_count(
+                    address, "pending"
+                )
+            nonce = self._nonces[address]
+            self._nonces[address] += 1
+            return nonce
+
+    def reset(self, address=None):
+        "forget the local nonces, they'll be fetched from the chain again"
+        with self._lock:
+            if address is None:
+                self._nonces.clear()
+            else:
+                self._nonces.pop(address, None)
+
+    def fill(self, tx):
+        tx = {"value": 0, "chainId": self.chain_id} | tx
+        if "gasPrice" not in tx and "maxFeePerGas" not in tx:
+            tx["gasPrice"] = self.gas_price()
+        if "gas" not in tx:
+            tx["gas"] = self.w3.eth.estimate_gas(tx)
+        if "nonce" not in tx:
+            tx["nonce"] = self.next_nonce(tx["from"])
+        return tx
+
+    def sign(self, tx, key):
+        acct = Account.from_key(key)
+        return acct.sign_transaction(self.fill(tx | {"from": acct.address}))
+
+    def send(self, tx, key):
+        "sign and send, return the tx hash"
+        signed = self.sign(tx, key)
+        try:
+            return self.w3.eth.send_raw_transaction(signed.rawTransaction)
+        except ValueError:
+            # the local nonce is probably out of sync, reconcile with the chain
+            self.reset(Account.from_key(key).address)
+            raise
+
+
+def sign_transaction(w3, tx, key=None, manager=None):
     "fill default fields and sign"
+    if key is None:
+        key = KEYS["validator"]
+    if manager is not None:
+        return manager.sign(tx, key)
     acct = Account.from_key(key)
     tx["from"] = acct.address
     tx = fill_transaction_defaults(w3, tx)
@@ -336,12 +536,47 @@ def sign_transaction(w3, tx, key=KEYS["validator"]):
     return acct.sign_transaction(tx)
 
 
-def send_transaction(w3, tx, key=KEYS["validator"]):
-    signed = sign_transaction(w3, tx, key)
+def send_transaction(w3, tx, key=None, manager=None):
+    signed = sign_transaction(w3, tx, key, manager=manager)
     txhash = w3.eth.send_raw_transaction(signed.rawTransaction)
     return w3.eth.wait_for_transaction_receipt(txhash)
 
 
+def wait_for_receipts(w3, txhashes, timeout=120, interval=0.1):
+    "wait for the receipts of all the txs together, return in the same order"
+    receipts = {}
+    deadline = time.monotonic() + timeout
+    while len(receipts) < len(txhashes):
+        for txhash in txhashes:
+            if txhash in receipts:
+                continue
+            try:
+                receipts[txhash] = w3.eth.get_transaction_receipt(txhash)
+            except TransactionNotFound:
+                pass
+        if len(receipts) == len(txhashes):
+            break
+        if time.monotonic() > deadline:
+            raise TimeoutError(
+                f"wait for receipts timeout, {len(txhashes) - len(receipts)} missing"
+            )
+        time.sleep(interval)
+    return [receipts[txhash] for txhash in txhashes]
+
+
+def send_transactions(w3, txs, key=None, manager=None, timeout=120):
+    """
+    sign the txs with consecutive nonces and send them back-to-back,
+    then wait for the receipts together.
+    """
+    if key is None:
+        key = KEYS["validator"]
+    if manager is None:
+        manager = NonceManager(w3)
+    txhashes = [manager.send(tx, key) for tx in txs]
+    return wait_for_receipts(w3, txhashes, timeout=timeout)
+
+
 def elysium_address_from_mnemonics(mnemonics, prefix=ELYSIUM_ADDRESS_PREFIX):
     "return elysium address from mnemonics"
     acct = Account.from_mnemonic(mnemonics)
@@ -395,7 +630,9 @@ def dump_toml(obj):
 class Contract:
     "General contract."
 
-    def __init__(self, contract_path, private_key=KEYS["validator"], chain_id=777):
+    def __init__(self, contract_path, private_key=None, chain_id=777):
+        if private_key is None:
+            private_key = KEYS["validator"]
         self.chain_id = chain_id
         self.account = Account.from_key(private_key)
         self.address = self.account.address
@@ -470,7 +707,7 @@ def modify_command_in_supervisor_config(ini: Path, fn, **kwargs):
     )
 
 
-def build_batch_tx(w3, cli, txs, key=KEYS["validator"]):
+def build_batch_tx(w3, cli, txs, key=None):
     "return cosmos batch tx and eth tx hashes"
     signed_txs = [sign_transaction(w3, tx, key) for tx in txs]
     tmp_txs = [cli.build_evm_tx(signed.rawTransaction.hex()) for signed in signed_txs]
@@ -516,6 +753,90 @@ def get_receipts_by_block(w3, blk):
     return rsp
 
 
+def fetch_receipts_batch(session, endpoint, heights):
+    "fetch the raw receipts of the blocks in a single json-rpc batch request"
+    rsp = session.post(
+        endpoint,
+        json=[
+            {
+                "jsonrpc": "2.0",
+                "id": height,
+                "method": "elysium_getTransactionReceiptsByBlock",
+                "params": [hex(height)],
+            }
+            for height in heights
+        ],
+    )
+    assert rsp.ok, f"{rsp.status_code} {rsp.reason}: {rsp.text}"
+    results = {}
+    for item in rsp.json():
+        assert "error" not in item, item["error"]
+        # the receipts of the blocks without eth txs are `null`
+        results[item["id"]] = item["result"] or []
+    return [results[height] for height in heights]
+
+
+def iter_block_receipts(w3, start, end, batch_size=20, workers=4, endpoint=None):
+    """
+    yield the receipts of the blocks in `[start, end]` in block order,
+    the blocks are fetched in json-rpc batches of `batch_size` blocks by `workers`
+    threads in parallel, a bounded number of batches are fetched ahead of the
+    consumer, and the receipts are only formatted when yielded.
+
+    endpoint: the http json-rpc endpoint, default to the one of the w3 provider.
+    """
+    if endpoint is None:
+        endpoint = str(getattr(w3.provider, "endpoint_uri", ""))
+        assert endpoint.startswith(
+            "http"
+        ), f"batch requests need a http endpoint, got provider: {w3.provider}"
+    with requests.Session() as session, ThreadPoolExecutor(workers) as exec:
+        pending = deque()
+        for begin in range(start, end + 1, batch_size):
+            heights = list(range(begin, min(begin + batch_size, end + 1)))
+            pending.append(
+                exec.submit(fetch_receipts_batch, session, endpoint, heights)
+            )
+            if len(pending) < workers * 2:
+                continue
+            for receipts in pending.popleft().result():
+                for item in receipts:
+                    yield AttributeDict(receipt_formatter(item))
+        while pending:
+            for receipts in pending.popleft().result():
+                for item in receipts:
+                    yield AttributeDict(receipt_formatter(item))
+
+
+def wait_for_block_receipts(
+    w3, txhashes, start, timeout=120, interval=0.1, endpoint=None
+):
+    """
+    wait for the txs by scanning the receipts of the new blocks since `start`,
+    instead of polling the receipt of each tx, return in the same order.
+    """
+    txhashes = [HexBytes(txhash) for txhash in txhashes]
+    pending = set(txhashes)
+    receipts = {}
+    height = start
+    deadline = time.monotonic() + timeout
+    while True:
+        latest = w3.eth.block_number
+        if latest >= height:
+            for receipt in iter_block_receipts(w3, height, latest, endpoint=endpoint):
+                txhash = HexBytes(receipt.transactionHash)
+                if txhash in pending:
+                    pending.remove(txhash)
+                    receipts[txhash] = receipt
+            height = latest + 1
+        if not pending:
+            break
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"wait for receipts timeout, {len(pending)} missing")
+        time.sleep(interval)
+    return [receipts[txhash] for txhash in txhashes]
+
+
 def send_raw_transactions(w3, raw_transactions):
     with ThreadPoolExecutor(len(raw_transactions)) as exec:
         tasks = [